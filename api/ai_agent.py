@@ -1,15 +1,50 @@
-from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate
-from langchain.chains import LLMChain
 from typing import Optional
 from typing_extensions import Annotated, TypedDict
 import os
+from config import Config
+from llm_executor import LLMExecutor
+from registry import registry
+
+# The Groq client, prompts and chains are built lazily through the registry
+# (langchain is only imported on first use). Import this module and read
+# ai_agent.summarize_chain etc. at call time rather than importing the names.
 
 # Initialize Groq LLM
-llm = ChatGroq(
-    model_name="llama3-8b-8192",
-    api_key="grok_api_key_here",
-    temperature=0.5
+LLM_MODEL = "llama3-8b-8192"
+LLM_TEMPERATURE = 0.5
+
+def _llm():
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        model_name=LLM_MODEL,
+        api_key="grok_api_key_here",
+        temperature=LLM_TEMPERATURE
+    )
+
+def _prompt(template):
+    def build():
+        from langchain.prompts import ChatPromptTemplate
+        return ChatPromptTemplate.from_template(template)
+    return build
+
+def _chain(prompt_name):
+    def build():
+        from langchain.chains import LLMChain
+        return LLMChain(llm=registry.get('llm'), prompt=registry.get(prompt_name))
+    return build
+
+def _structured_llm(schema):
+    return lambda: registry.get('llm').with_structured_output(schema)
+
+registry.register('llm', _llm)
+
+# Shared executor every chain call is submitted through: bounded concurrency,
+# requests/tokens per minute limits and retries on 429/5xx
+llm_executor = LLMExecutor(
+    max_workers=Config.LLM_CONCURRENCY,
+    requests_per_minute=Config.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=Config.LLM_TOKENS_PER_MINUTE,
+    max_retries=Config.LLM_MAX_RETRIES
 )
 
 # Define TypedDict for structured output
@@ -21,12 +56,11 @@ class MatchScores(TypedDict):
     other_score: Annotated[int, ..., "Score for other requirements (0-100)"]
 
 # Create structured LLM
-match_score_structured_llm = llm.with_structured_output(MatchScores)
+registry.register('match_score_structured_llm', _structured_llm(MatchScores))
 
 # Define LangChain Prompts and Chains for Each Task
 # Summarization Chain
-summarize_prompt = ChatPromptTemplate.from_template(
-    """Summarize the following job description into key points, including role, responsibilities, and qualifications, in bullet points:
+SUMMARIZE_TEMPLATE = """Summarize the following job description into key points, including role, responsibilities, and qualifications, in bullet points:
 
     Job Description: {job_description}
 
@@ -34,12 +68,11 @@ summarize_prompt = ChatPromptTemplate.from_template(
     - Role: [Role]
     - Responsibilities: [Responsibilities]
     - Qualifications: [Qualifications]"""
-)
-summarize_chain = LLMChain(llm=llm, prompt=summarize_prompt)
+registry.register('summarize_prompt', _prompt(SUMMARIZE_TEMPLATE))
+registry.register('summarize_chain', _chain('summarize_prompt'))
 
 # Candidate Matching Chain
-match_prompt = ChatPromptTemplate.from_template(
-    """Match the following job description to the candidate's resume text and provide four separate match scores (0-100) for experience, skills, education, and other requirements (e.g., certifications, soft skills) specified in the job description.
+MATCH_TEMPLATE = """Match the following job description to the candidate's resume text and provide four separate match scores (0-100) for experience, skills, education, and other requirements (e.g., certifications, soft skills) specified in the job description.
 
     Job Description: {job_description}
     Resume Text: {resume_text}
@@ -49,12 +82,44 @@ match_prompt = ChatPromptTemplate.from_template(
     Skills Score: [Score]
     Education Score: [Score]
     Other Score: [Score]"""
-)
-match_chain = LLMChain(llm=llm, prompt=match_prompt)
+registry.register('match_prompt', _prompt(MATCH_TEMPLATE))
+registry.register('match_chain', _chain('match_prompt'))
+
+# Bump whenever match_prompt or MatchScores changes so stored scores get recomputed
+MATCH_PROMPT_VERSION = 1
+
+# Batched Candidate Matching: several resumes for one job in a single request
+class CandidateMatchScores(MatchScores):
+    """Match scores for one candidate of the batch."""
+    candidate_id: Annotated[str, ..., "The candidate's ID exactly as given"]
+
+class BatchMatchScores(TypedDict):
+    """Match scores for every candidate of the batch."""
+    scores: Annotated[list[CandidateMatchScores], ..., "One entry per candidate"]
+
+registry.register('batch_match_structured_llm', _structured_llm(BatchMatchScores))
+
+BATCH_MATCH_TEMPLATE = """Match the following job description to each candidate's resume text and provide four separate match scores (0-100) for experience, skills, education, and other requirements (e.g., certifications, soft skills) specified in the job description. Score every candidate independently.
+
+    Job Description: {job_description}
+
+    Candidates:
+    {candidates}
+
+    Output format, one entry per candidate:
+    Candidate ID: [ID]
+    Experience Score: [Score]
+    Skills Score: [Score]
+    Education Score: [Score]
+    Other Score: [Score]"""
+registry.register('batch_match_prompt', _prompt(BATCH_MATCH_TEMPLATE))
+
+def format_candidates(candidates):
+    # (candidate_id, resume_text) pairs as the {candidates} block of batch_match_prompt
+    return '\n\n    '.join(f'Candidate ID: {candidate_id}\n    Resume Text: {text}' for candidate_id, text in candidates)
 
 # Summarization Chain (Resume)
-summarize_resume_prompt = ChatPromptTemplate.from_template(
-    """Summarize the following resume into key points, including experience, skills, and education. Extract relevant data such as years of experience and specific skills for matching purposes.
+SUMMARIZE_RESUME_TEMPLATE = """Summarize the following resume into key points, including experience, skills, and education. Extract relevant data such as years of experience and specific skills for matching purposes.
 
     Resume: {resume}
 
@@ -65,19 +130,18 @@ summarize_resume_prompt = ChatPromptTemplate.from_template(
     - Extracted Data:
       - Years of Experience: [Number]
       - Specific Skills: [Comma-separated list]"""
-)
-summarize_resume_chain = LLMChain(llm=llm, prompt=summarize_resume_prompt)
+registry.register('summarize_resume_prompt', _prompt(SUMMARIZE_RESUME_TEMPLATE))
+registry.register('summarize_resume_chain', _chain('summarize_resume_prompt'))
 
 # Interview Scheduling Chain
-schedule_prompt = ChatPromptTemplate.from_template(
-    """Propose three specific interview time slots (date and time) for a candidate, considering the job urgency: '{urgency}'. Provide a brief justification for the urgency.
+SCHEDULE_TEMPLATE = """Propose three specific interview time slots (date and time) for a candidate, considering the job urgency: '{urgency}'. Provide a brief justification for the urgency.
 
     Output format:
     - [Date, Time]: [Justification]
     - [Date, Time]: [Justification]
     - [Date, Time]: [Justification]"""
-)
-schedule_chain = LLMChain(llm=llm, prompt=schedule_prompt)
+registry.register('schedule_prompt', _prompt(SCHEDULE_TEMPLATE))
+registry.register('schedule_chain', _chain('schedule_prompt'))
 
 # Define TypedDict for structured output
 class SelectedCandidates(TypedDict):
@@ -85,11 +149,10 @@ class SelectedCandidates(TypedDict):
     candidate_ids: list[str]
 
 # Create structured LLM
-filter_prompt_structured_llm = llm.with_structured_output(SelectedCandidates)
+registry.register('filter_prompt_structured_llm', _structured_llm(SelectedCandidates))
 
 # Enhanced Filter Candidates Prompt with job_data and analysis instruction
-filter_prompt = ChatPromptTemplate.from_template(
-    """You are an expert recruiter selecting candidates for a job based on their match scores. 
+FILTER_TEMPLATE = """You are an expert recruiter selecting candidates for a job based on their match scores. 
     Each candidate has a JSON match score with four fields: experience_score, skills_score, education_score, and other_score (all 0-100). 
     Your task is to evaluate which candidates are the best fit for the given job role by qualitatively analyzing their scores.
 
@@ -117,4 +180,10 @@ filter_prompt = ChatPromptTemplate.from_template(
     ```
     If no candidates are suitable, return an empty list. Limit the max to 2 only.
     """
-)
\ No newline at end of file
+registry.register('filter_prompt', _prompt(FILTER_TEMPLATE))
+
+def __getattr__(name):
+    # ai_agent.<chain/prompt/llm> resolves through the registry on first access
+    if name in registry:
+        return registry.get(name)
+    raise AttributeError(f"module 'ai_agent' has no attribute '{name}'")
@@ -1,8 +1,9 @@
 from flask import Flask
 from flask_cors import CORS
 from config import Config
-from routes import register_routes
+from routes import register_routes, task_queue
 from models import init_db
+from registry import registry
 
 def create_app():
     app = Flask(__name__)
@@ -19,6 +20,14 @@ def create_app():
     
     # Register routes
     register_routes(app)
+
+    # Start the background workers for pipeline tasks
+    task_queue.start(Config.TASK_WORKERS)
+
+    # Load models and LLM clients in the background; requests that need one
+    # before it's ready just wait for it
+    if Config.PREWARM_MODELS:
+        registry.prewarm()
     
     return app
 
@@ -0,0 +1,268 @@
+"""End-to-end pipeline benchmark: extract -> summarize -> compute matches -> select,
+on a synthetic corpus with a deterministic fake LLM, at several sizes."""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_FILE = os.path.join(API_DIR, 'custom-vectordb', 'extracted_text.csv')
+
+ROLES = ['Backend Engineer', 'Data Scientist', 'Frontend Developer', 'DevOps Engineer', 'Product Manager',
+         'ML Engineer', 'QA Engineer', 'Data Analyst', 'Security Engineer', 'Mobile Developer']
+SKILLS = ['Python', 'Java', 'SQL', 'React', 'AWS', 'Kubernetes', 'TensorFlow', 'Go', 'Docker', 'Spark',
+          'TypeScript', 'Linux', 'Terraform', 'PyTorch', 'Tableau', 'Kotlin', 'Swift', 'Airflow']
+
+def load_resumes(path=CORPUS_FILE):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row['Text'] for row in csv.DictReader(f) if row.get('Text')]
+
+def job_description(i):
+    role = ROLES[i % len(ROLES)]
+    skills = ', '.join(SKILLS[(i * 7 + k) % len(SKILLS)] for k in range(4))
+    return (f'{role} #{i}\nResponsibilities\nDesign, build and operate {role.lower()} systems for team {i}.\n'
+            f'Requirements\n{3 + i % 6}+ years of experience with {skills}.\n'
+            f'Qualifications\nBachelor degree in Computer Science or equivalent experience.')
+
+class HashingEmbedder:
+    # Deterministic stand-in for SentenceTransformer: hashed bag of words, normalized
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=64, **kwargs):
+        import numpy as np
+        import zlib
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                matrix[row, zlib.crc32(word.encode('utf-8')) % self.dim] += 1
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1)
+
+class FormatPrompt:
+    # str.format stand-in for ChatPromptTemplate, so the benchmark doesn't need langchain
+    def __init__(self, template):
+        self.template = template
+
+    def format(self, **kwargs):
+        return self.template.format(**kwargs)
+
+def write_pdf(path, text):
+    import fitz
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=8)
+    document.save(path)
+
+def seed(jobs, applications, pdf=False):
+    # Jobs plus applications spread over them; every application gets its own
+    # resume file (a variant of a corpus resume) so nothing is shared by hash
+    import db
+    import pdf_extract
+    from config import Config
+    from embeddings import text_hash
+
+    resumes = load_resumes()
+    with db.transaction() as conn:
+        conn.executemany('''
+            INSERT INTO jobs (title, description, description_hash, threshold, max_candidates)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(ROLES[i % len(ROLES)], job_description(i), text_hash(job_description(i)), 10, 5)
+              for i in range(jobs)])
+    job_ids = [row[0] for row in db.get_connection().execute('SELECT id FROM jobs ORDER BY id')]
+
+    rows, cached = [], []
+    for i in range(applications):
+        text = f'{resumes[i % len(resumes)]}\nApplicant reference: {i}'
+        filename = f'resume_{i}.pdf'
+        path = os.path.join(Config.RESUMES_FOLDER, filename)
+        if pdf:
+            write_pdf(path, text)
+        else:
+            # Text mode: the file only has to hash uniquely; its text is pre-seeded
+            # into pdf_text_cache so PyMuPDF is never called
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            cached.append((pdf_extract.file_sha256(path), text))
+        rows.append((f'applicant{i}', f'applicant{i}@example.com', filename, job_ids[i % len(job_ids)],
+                     f'2024-01-01T00:00:{i % 60:02d}.{i:06d}'))
+    with db.transaction() as conn:
+        conn.executemany('INSERT OR REPLACE INTO pdf_text_cache (sha256, text) VALUES (?, ?)', cached)
+        conn.executemany('''
+            INSERT INTO applications (username, email, resume_text, job_id, applied_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+
+def install_fakes(args):
+    # Must run before pipeline/ai_agent are imported: the executor is built from Config
+    from config import Config
+    Config.LLM_CONCURRENCY = args.concurrency
+    Config.LLM_REQUESTS_PER_MINUTE = args.requests_per_minute
+    Config.LLM_TOKENS_PER_MINUTE = None
+    Config.PDF_WORKERS = args.pdf_workers or Config.PDF_WORKERS
+
+    import ai_agent
+    import pipeline  # registers the real embedding model, replaced below
+    from fake_llm import FakeLLM
+    from registry import registry
+
+    fake = FakeLLM(latency=args.latency, jitter=args.jitter, seed=0)
+    for name in ['summarize_chain', 'summarize_resume_chain', 'match_chain', 'schedule_chain']:
+        registry.register(name, lambda: fake)
+    registry.register('match_score_structured_llm', lambda: fake)
+    registry.register('filter_prompt_structured_llm', lambda: fake)
+    registry.register('batch_match_structured_llm', lambda: type('Batch', (), {'invoke': staticmethod(fake.invoke_batch)})())
+    for name, template in [('summarize_prompt', ai_agent.SUMMARIZE_TEMPLATE),
+                           ('match_prompt', ai_agent.MATCH_TEMPLATE),
+                           ('summarize_resume_prompt', ai_agent.SUMMARIZE_RESUME_TEMPLATE),
+                           ('batch_match_prompt', ai_agent.BATCH_MATCH_TEMPLATE)]:
+        registry.register(name, lambda template=template: FormatPrompt(template))
+    if not args.real_embeddings:
+        registry.register('embedding_model', HashingEmbedder)
+    return fake
+
+def _rss_mb():
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def _db_writes():
+    import metrics
+    histogram = metrics._histograms.get(('db_transaction_seconds', ()), {'count': 0, 'sum': 0.0})
+    return histogram['count'], histogram['sum']
+
+def run_size(args):
+    # Child process: one corpus size in a fresh working directory and database
+    sys.path.insert(0, API_DIR)
+    from config import Config
+    Config.PREWARM_MODELS = False
+    Config.create_directories()
+    fake = install_fakes(args)
+
+    from models import init_db
+    import pipeline
+    init_db()
+
+    start = time.perf_counter()
+    seed(args.jobs, args.applications, pdf=args.pdf)
+    report = {
+        'applications': args.applications,
+        'jobs': args.jobs,
+        'setupSeconds': round(time.perf_counter() - start, 3),
+        'stages': {}
+    }
+
+    stages = [
+        ('extract-pdf-data', lambda: pipeline.extract_pdf_data(), 'extracted'),
+        ('summarize-job', lambda: pipeline.summarize_jobs(), 'summarized'),
+        ('compute-matches', lambda: pipeline.compute_matches(top_n=args.top_n), 'scored'),
+        ('select-candidates', lambda: pipeline.select_candidates(), 'selected'),
+    ]
+    for name, stage, items_key in stages:
+        calls_before = fake.calls
+        writes_before, write_seconds_before = _db_writes()
+        start = time.perf_counter()
+        result = stage()
+        seconds = time.perf_counter() - start
+        writes, write_seconds = _db_writes()
+        items = result.get(items_key, 0)
+        report['stages'][name] = {
+            'seconds': round(seconds, 3),
+            'items': items,
+            'throughputPerSecond': round(items / seconds, 2) if seconds > 0 else None,
+            'llmCalls': fake.calls - calls_before,
+            'dbTransactions': writes - writes_before,
+            'dbTransactionSeconds': round(write_seconds - write_seconds_before, 3),
+            'errors': len(result.get('errors', [])),
+            'peakRssMb': _rss_mb()
+        }
+    report['totalSeconds'] = round(sum(stage['seconds'] for stage in report['stages'].values()), 3)
+    report['peakRssMb'] = _rss_mb()
+    print(json.dumps(report))
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=API_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline, current):
+    # Per-stage seconds ratio current / baseline for the sizes both files have
+    old = {run['applications']: run for run in baseline['runs']}
+    for run in current['runs']:
+        base = old.get(run['applications'])
+        if not base:
+            continue
+        for name, stage in run['stages'].items():
+            before = base['stages'].get(name, {}).get('seconds')
+            if before:
+                print(f"{run['applications']:>7} {name:<18} {before:>9.3f}s -> {stage['seconds']:>9.3f}s "
+                      f"({stage['seconds'] / before:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='numbers of applications to benchmark')
+    parser.add_argument('--applications-per-job', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.01, help='fake LLM seconds per call')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests-per-minute', type=int, default=None)
+    parser.add_argument('--top-n', type=int, default=None, help='hybrid prefilter size (default: Config)')
+    parser.add_argument('--pdf', action='store_true', help='write real PDFs (needs PyMuPDF) instead of seeding text')
+    parser.add_argument('--pdf-workers', type=int, default=None)
+    parser.add_argument('--real-embeddings', action='store_true', help='use SentenceTransformer instead of hashing')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--applications', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--jobs', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_size(args)
+        return
+
+    passthrough = ['--latency', str(args.latency), '--jitter', str(args.jitter),
+                   '--concurrency', str(args.concurrency)]
+    for flag, value in [('--requests-per-minute', args.requests_per_minute), ('--top-n', args.top_n),
+                        ('--pdf-workers', args.pdf_workers)]:
+        if value is not None:
+            passthrough += [flag, str(value)]
+    passthrough += ['--pdf'] * args.pdf + ['--real-embeddings'] * args.real_embeddings
+
+    runs = []
+    for size in args.sizes:
+        jobs = max(1, size // args.applications_per_job)
+        # Each size runs in its own interpreter and directory: clean caches, clean peak RSS
+        with tempfile.TemporaryDirectory() as cwd:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', '--applications', str(size),
+                 '--jobs', str(jobs), *passthrough],
+                cwd=cwd, check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        runs.append(run)
+        print(f"{size:>7} applications / {jobs} jobs: {run['totalSeconds']}s, peak RSS {run['peakRssMb']} MB")
+
+    results = {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': {key: value for key, value in vars(args).items()
+                     if key not in ('child', 'applications', 'jobs', 'output', 'compare')},
+        'runs': runs
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import re
+from collections import Counter
+
+# Prompt input compaction. Raw PDF text and pasted job descriptions carry
+# page headers/footers, page numbers, runs of whitespace and boilerplate that
+# cost tokens without helping the model. compact() cleans the text, and if
+# it is still over the token budget, trims it section by section so every
+# section keeps its head instead of the tail of the document being lost.
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+BOILERPLATE = [
+    re.compile(r'^\s*page\s+\d+(\s+of\s+\d+)?\s*$', re.I),
+    re.compile(r'^\s*(references|referees)\s+(are\s+)?available\s+(up)?on\s+request\.?\s*$', re.I),
+    re.compile(r'^\s*(curriculum\s+vitae|resume|résumé)\s*$', re.I),
+    re.compile(r'^\s*(we\s+are\s+an\s+equal\s+opportunity\s+employer|equal\s+opportunity\s+employer).*$', re.I),
+]
+
+# A bare number is only a page number at the top or bottom of a page, and at
+# most three digits, so years and counts in the body are kept
+PAGE_NUMBER = re.compile(r'^\s*-?\s*\d{1,3}\s*-?\s*$')
+PAGE_EDGE_LINES = 2  # non-blank lines at each end of a page that may be header/footer
+
+SECTION_HEADER = re.compile(
+    r'^\s*(professional\s+)?(summary|profile|objective|experience|work\s+experience|employment(\s+history)?|'
+    r'skills|technical\s+skills|education|projects|certifications?|awards|publications|languages|interests|'
+    r'responsibilities|requirements|qualifications|about\s+(us|the\s+role)|benefits|what\s+you.ll\s+do)\s*:?\s*$',
+    re.I
+)
+
+def count_tokens(text):
+    # Approximates a BPE tokenizer: punctuation is a token, long words split every ~6 characters
+    return sum(1 + (len(piece) - 1) // 6 for piece in _TOKEN.findall(text or ''))
+
+def _page_edges(page):
+    # Indexes of the first and last PAGE_EDGE_LINES non-blank lines of a page
+    filled = [i for i, line in enumerate(page) if line]
+    return set(filled[:PAGE_EDGE_LINES] + filled[-PAGE_EDGE_LINES:])
+
+def clean(text):
+    # Pages are separated by form feeds (see pdf_extract.parse_pdf); text
+    # without them is one page
+    pages = [
+        [re.sub(r'[ \t\u00a0]+', ' ', line).strip() for line in page.split('\n')]
+        for page in (text or '').replace('\r', '\n').split('\f')
+    ]
+    edges = [_page_edges(page) for page in pages]
+    # Short lines repeated at the edges of several pages are headers/footers; keep the first copy
+    repeats = Counter()
+    for page, page_edges in zip(pages, edges):
+        repeats.update({page[i].lower() for i in page_edges if len(page[i]) <= 80})
+    seen = set()
+    kept = []
+    for page, page_edges in zip(pages, edges):
+        for i, line in enumerate(page):
+            if any(pattern.match(line) for pattern in BOILERPLATE):
+                continue
+            if i in page_edges:
+                if PAGE_NUMBER.match(line):
+                    continue
+                key = line.lower()
+                if repeats[key] > 1:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+            if not line and (not kept or not kept[-1]):
+                continue  # collapse blank runs
+            kept.append(line)
+    return '\n'.join(kept).strip()
+
+def _sections(text):
+    sections = [[]]
+    for line in text.split('\n'):
+        if SECTION_HEADER.match(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return ['\n'.join(lines) for lines in sections]
+
+def _truncate(text, budget):
+    # Keep whole lines (then whole sentences of the line that crosses the budget)
+    kept, used = [], 0
+    for line in text.split('\n'):
+        cost = count_tokens(line) + 1
+        if used + cost <= budget:
+            kept.append(line)
+            used += cost
+            continue
+        sentence_kept = []
+        for sentence in re.split(r'(?<=[.;!?])\s+', line):
+            cost = count_tokens(sentence) + 1
+            if used + cost > budget:
+                break
+            sentence_kept.append(sentence)
+            used += cost
+        if not sentence_kept and not kept:
+            # One unbroken run of text: keep as many words as fit
+            for word in line.split():
+                cost = count_tokens(word)
+                if used + cost > budget:
+                    break
+                sentence_kept.append(word)
+                used += cost
+        if sentence_kept:
+            kept.append(' '.join(sentence_kept))
+        break
+    return '\n'.join(kept)
+
+def compact(text, budget):
+    # Returns (compacted text, stats); stats has the original/compacted token
+    # counts and whether anything beyond boilerplate had to be dropped
+    original_tokens = count_tokens(text)
+    cleaned = clean(text)
+    cleaned_tokens = count_tokens(cleaned)
+    truncated = cleaned_tokens > budget
+    if truncated:
+        sections = _sections(cleaned)
+        sizes = [sum(count_tokens(line) + 1 for line in section.split('\n')) for section in sections]
+        # Water-fill the budget: small sections are kept whole, the rest share what's left
+        shares = [0] * len(sections)
+        remaining, open_sections = budget, list(range(len(sections)))
+        while open_sections:
+            fair = remaining // len(open_sections)
+            small = [i for i in open_sections if sizes[i] <= fair]
+            if not small:
+                for i in open_sections:
+                    shares[i] = fair
+                break
+            for i in small:
+                shares[i] = sizes[i]
+                remaining -= sizes[i]
+            open_sections = [i for i in open_sections if i not in small]
+        cleaned = '\n'.join(
+            part for part in (_truncate(section, share) for section, share in zip(sections, shares)) if part
+        )
+    return cleaned, {
+        'originalTokens': original_tokens,
+        'compactedTokens': count_tokens(cleaned),
+        'truncated': truncated
+    }
@@ -6,6 +6,46 @@ class Config:
     RESUMES_FOLDER = os.path.join(UPLOAD_FOLDER, 'resumes')
     APPLICATIONS_FILE = os.path.join(UPLOAD_FOLDER, 'applications.json')
     DATABASE_FILE = os.path.join(UPLOAD_FOLDER, 'applications.db')
+    LLM_CACHE_TTL_SECONDS = 30 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES = 50000
+    LLM_CONCURRENCY = 8
+    LLM_REQUESTS_PER_MINUTE = 30
+    LLM_TOKENS_PER_MINUTE = 30000
+    LLM_MAX_RETRIES = 5
+    LLM_OUTPUT_TOKEN_ESTIMATE = 256
+    PIPELINE_BATCH_SIZE = 50
+    PDF_WORKERS = os.cpu_count() or 1
+    TASK_WORKERS = 2
+    TASK_POLL_SECONDS = 1.0
+    TASK_HEARTBEAT_SECONDS = 10
+    TASK_LEASE_SECONDS = 60  # a running task not heartbeated for this long is requeued
+    SQLITE_BUSY_TIMEOUT_SECONDS = 30
+    SQLITE_CACHED_STATEMENTS = 256
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    SQLITE_CACHE_KB = 64 * 1024
+    API_PAGE_SIZE = 100
+    API_MAX_PAGE_SIZE = 1000
+    PREWARM_MODELS = True
+    METRICS_ENABLED = True
+    METRICS_SAMPLE_RATE = 1.0
+    RESUME_TOKEN_BUDGET = 3000
+    JOB_TOKEN_BUDGET = 1500
+    LLM_MATCH_BATCH_SIZE = 8
+    LLM_MATCH_BATCH_TOKENS = 6000
+    LLM_MATCH_OUTPUT_TOKENS_PER_CANDIDATE = 64
+    HYBRID_TOP_N = 20
+    HYBRID_FUSION = 'rrf'
+    HYBRID_LEXICAL_WEIGHT = 1.0
+    HYBRID_SEMANTIC_WEIGHT = 1.0
+    HYBRID_RRF_K = 60
+    EMBEDDING_STORAGE = 'json'  # 'json', 'float16' or 'int8' for applications/jobs.embedding
+    EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'  # also the embedding cache key
+    EMBEDDING_SERVER_SOCKET = os.path.join(UPLOAD_FOLDER, 'embeddings.sock')
+    EMBEDDING_SERVER_BATCH_WINDOW_MS = 5
+    EMBEDDING_SERVER_MAX_BATCH = 256
+    EMBEDDING_SERVER_TIMEOUT_SECONDS = 60
+    EMBEDDING_SERVER_RETRY_SECONDS = 30
+    BULK_MAX_ENTRY_BYTES = 20 * 1024 * 1024
     
     @staticmethod
     def create_directories():
@@ -0,0 +1,105 @@
+import os
+import numpy as np
+from typing import Dict, List, Optional, Set
+
+class IVFIndex:
+    """Inverted-file index over L2-normalized vectors.
+
+    Vectors are bucketed by their nearest k-means centroid; a query only
+    scores the members of its `nprobe` closest buckets. The index keeps ids
+    only, the vectors themselves stay in the owning VectorDB.
+    """
+
+    def __init__(self, dim: int, nlist: int = 64, nprobe: int = 8, n_iter: int = 10, seed: int = 0):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[Set[str]] = []
+        self.assignment: Dict[str, int] = {}
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray, ids: List[str]):
+        # Spherical k-means: centroids stay unit length so assignment is a dot product
+        rng = np.random.default_rng(self.seed)
+        nlist = min(self.nlist, len(vectors))
+        sample = vectors
+        if len(vectors) > 256 * nlist:
+            sample = vectors[rng.choice(len(vectors), 256 * nlist, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.n_iter):
+            labels = self._nearest(sample, centroids)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+                else:
+                    centroids[c] = sample[rng.integers(len(sample))]
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        self.centroids = centroids.astype(np.float32)
+        self.lists = [set() for _ in range(nlist)]
+        self.assignment = {}
+        self.add_many(vectors, ids)
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            labels[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+        return labels
+
+    def add_many(self, vectors: np.ndarray, ids: List[str]):
+        if not self.is_trained or not len(ids):
+            return
+        for meta_id, label in zip(ids, self._nearest(np.asarray(vectors), self.centroids)):
+            self.remove(meta_id)
+            self.lists[label].add(meta_id)
+            self.assignment[meta_id] = int(label)
+
+    def add(self, meta_id: str, vec: np.ndarray):
+        self.add_many(vec.reshape(1, -1), [meta_id])
+
+    def remove(self, meta_id: str):
+        label = self.assignment.pop(meta_id, None)
+        if label is not None:
+            self.lists[label].discard(meta_id)
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> List[str]:
+        nprobe = min(nprobe or self.nprobe, len(self.lists))
+        scores = self.centroids @ query
+        probe = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        result: List[str] = []
+        for label in probe:
+            result.extend(self.lists[label])
+        return result
+
+    def save(self, path: str):
+        ids = list(self.assignment)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                ids=np.array(ids, dtype=object),
+                labels=np.array([self.assignment[i] for i in ids], dtype=np.int64),
+            )
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        data = np.load(path, allow_pickle=True)
+        if data["centroids"].shape[1] != self.dim:
+            return False
+        self.centroids = data["centroids"]
+        self.lists = [set() for _ in range(len(self.centroids))]
+        self.assignment = {}
+        for meta_id, label in zip(data["ids"], data["labels"]):
+            self.lists[label].add(meta_id)
+            self.assignment[meta_id] = int(label)
+        return True
@@ -0,0 +1,42 @@
+import numpy as np
+from typing import Optional, Tuple
+
+QUANTIZATIONS = ("int8", "float16")
+
+def quantize(vectors: np.ndarray, kind: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Compress an (N, dim) float32 matrix for scanning.
+
+    int8 keeps one float32 scale per row (max |x| / 127), so a row costs
+    dim + 4 bytes instead of 4 * dim; float16 halves the size with no scale.
+    Returns (codes, scales), scales is None for float16.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if kind == "float16":
+        return vectors.astype(np.float16), None
+    if kind == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127 if len(vectors) else np.empty(0, dtype=np.float32)
+        scales = np.where(scales > 0, scales, 1).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"Unknown quantization: {kind}, expected one of {QUANTIZATIONS}")
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    vectors = codes.astype(np.float32)
+    if scales is not None:
+        vectors *= scales[:, None]
+    return vectors
+
+def scan(codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray, chunk: int = 1024) -> np.ndarray:
+    # Approximate dot products of every row with a float32 query. NumPy has no
+    # fast int8/float16 matmul, so rows are widened into one reused float32
+    # buffer a chunk at a time: the full-precision copy never exists, and the
+    # chunk stays in cache for the matmul.
+    scores = np.empty(len(codes), dtype=np.float32)
+    buffer = np.empty((min(chunk, len(codes)), codes.shape[1]), dtype=np.float32)
+    for start in range(0, len(codes), chunk):
+        block = buffer[:len(codes[start:start + chunk])]
+        block[...] = codes[start:start + chunk]
+        scores[start:start + len(block)] = block @ query
+    if scales is not None:
+        scores *= scales
+    return scores
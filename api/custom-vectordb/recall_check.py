@@ -0,0 +1,105 @@
+"""Recall/latency check of the IVF index and of quantized scans against exact search on extracted_text.csv."""
+import argparse
+import csv
+import os
+import tempfile
+import time
+import numpy as np
+from typing import Dict, List
+from vector_db import VectorDB
+from quantization import QUANTIZATIONS
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extracted_text.csv")
+
+def load_corpus(path: str = CORPUS_FILE) -> List[Dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row for row in csv.DictReader(f) if row.get("Text")]
+
+def evaluate_recall(db: VectorDB, queries: np.ndarray, top_k: int = 10,
+                    nprobe_values=(1, 2, 4, 8, 16)) -> List[Dict]:
+    start = time.perf_counter()
+    exact = [{meta["id"] for _, meta in db.search(q, top_k, exact=True)} for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    report = [{"nprobe": "exact", "recall": 1.0, "ms_per_query": round(exact_ms, 3)}]
+    expected = sum(len(truth) for truth in exact)
+    for nprobe in nprobe_values:
+        hits = 0
+        start = time.perf_counter()
+        for query, truth in zip(queries, exact):
+            found = {meta["id"] for _, meta in db.search(query, top_k, nprobe=nprobe)}
+            hits += len(found & truth)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        report.append({
+            "nprobe": nprobe,
+            "recall": round(hits / expected, 4) if expected else 1.0,
+            "ms_per_query": round(elapsed_ms, 3)
+        })
+    return report
+
+def evaluate_quantization(db_path: str, dim: int, queries: np.ndarray, top_k: int = 10,
+                          rerank_values=(0, 2, 4, 8)) -> List[Dict]:
+    # Exact float32 scan vs. int8/float16 scans, with and without exact re-ranking
+    db = VectorDB(db_path, dim)
+    start = time.perf_counter()
+    exact = [{meta["id"] for _, meta in db.search(q, top_k)} for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    report = [{"quantize": "float32", "rerank": "-", "recall": 1.0, "ms_per_query": round(exact_ms, 3),
+               "memory_mb": round(db.nbytes / 2 ** 20, 2)}]
+    db.conn.close()
+
+    expected = sum(len(truth) for truth in exact)
+    for kind in QUANTIZATIONS:
+        for rerank in rerank_values:
+            db = VectorDB(db_path, dim, quantize=kind, rerank=rerank)
+            db.search(queries[0], top_k)  # load outside the timing
+            hits = 0
+            start = time.perf_counter()
+            for query, truth in zip(queries, exact):
+                hits += len({meta["id"] for _, meta in db.search(query, top_k)} & truth)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            report.append({
+                "quantize": kind,
+                "rerank": rerank,
+                "recall": round(hits / expected, 4) if expected else 1.0,
+                "ms_per_query": round(elapsed_ms, 3),
+                "memory_mb": round(db.nbytes / 2 ** 20, 2)
+            })
+            db.conn.close()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--nlist", type=int, default=16)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--holdout", type=float, default=0.2, help="fraction of resumes used as queries")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(args.model)
+    corpus = load_corpus()
+    embeddings = model.encode([row["Text"] for row in corpus], batch_size=64, normalize_embeddings=True)
+
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(corpus))
+    n_queries = max(1, int(len(corpus) * args.holdout))
+    query_rows, index_rows = order[:n_queries], order[n_queries:]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = VectorDB(os.path.join(tmp, "recall.db"), dim=embeddings.shape[1], index="ivf", nlist=args.nlist)
+        for row in index_rows:
+            db.add(embeddings[row], {"id": corpus[row]["Filename"], "text": corpus[row]["Text"], "type": "resume"})
+        db.rebuild_index()
+
+        print(f"{len(index_rows)} indexed, {n_queries} queries, nlist={args.nlist}, top_k={args.top_k}")
+        for line in evaluate_recall(db, embeddings[query_rows], args.top_k):
+            print(f"nprobe={line['nprobe']:>6}  recall@{args.top_k}={line['recall']:.3f}  {line['ms_per_query']:.3f} ms/query")
+        db.close()
+
+        for line in evaluate_quantization(db.db_path, embeddings.shape[1], embeddings[query_rows], args.top_k):
+            print(f"{line['quantize']:>8} rerank={line['rerank']:>2}  recall@{args.top_k}={line['recall']:.3f}  "
+                  f"{line['ms_per_query']:.3f} ms/query  {line['memory_mb']:.2f} MB")
+
+if __name__ == "__main__":
+    main()
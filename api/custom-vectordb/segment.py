@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import sqlite3
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from quantization import quantize
+
+SEGMENT_COLUMNS = ("type", "job_id", "created_at")
+
+class VectorSegment:
+    """Immutable, memory-mapped snapshot of a VectorDB table.
+
+    A segment directory holds generations (seg-<n>/) of .npy files: the
+    vectors (float32, or int8/float16 codes plus int8 scales), the ids sorted
+    ascending and the filter columns as fixed-width strings ('' for NULL).
+    CURRENT names the live generation and the vector_log sequence number it is
+    consistent with; writes after that are replayed from the log. Every process
+    maps the same files read-only, so their pages are shared through the OS page
+    cache instead of being copied into each worker.
+    """
+
+    def __init__(self, path: str, meta: Dict):
+        self.path = path
+        self.seq: int = meta["seq"]
+        self.size: int = meta["size"]
+        self.quantize: Optional[str] = meta["quantize"]
+        self.vectors = self._map("vectors")
+        self.scales = self._map("scales") if self.quantize == "int8" else None
+        self.ids = self._map("ids")
+        self.columns = {column: self._map(column) for column in SEGMENT_COLUMNS}
+
+    def _map(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+
+    @property
+    def nbytes(self) -> int:
+        # Shared (page cache) bytes of the vectors, not private to any worker
+        return self.vectors.nbytes + (0 if self.scales is None else self.scales.nbytes)
+
+    @staticmethod
+    def version(directory: str) -> Optional[Tuple[int, int]]:
+        # Cheap change check: CURRENT is replaced, never rewritten in place
+        try:
+            stat = os.stat(os.path.join(directory, "CURRENT"))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @classmethod
+    def open(cls, directory: str) -> Optional["VectorSegment"]:
+        try:
+            with open(os.path.join(directory, "CURRENT")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        return cls(os.path.join(directory, meta["generation"]), meta)
+
+    def rows_of(self, ids: List[str]) -> np.ndarray:
+        # Segment rows of the ids that are in it (ids are sorted, so a binary search)
+        if not len(ids) or not self.size:
+            return np.empty(0, dtype=np.int64)
+        ids = np.asarray(ids, dtype=str)
+        rows = np.minimum(np.searchsorted(self.ids, ids), self.size - 1)
+        return rows[self.ids[rows] == ids]
+
+    @classmethod
+    def write(cls, directory: str, conn: sqlite3.Connection, dim: int,
+              quantize_as: Optional[str] = None, chunk: int = 4096) -> "VectorSegment":
+        # Snapshot the table into a new generation and make it current. The
+        # snapshot and its log position come from one read transaction, and the
+        # arrays are filled through memmaps a chunk at a time, so the export
+        # needs no more memory than one chunk.
+        os.makedirs(directory, exist_ok=True)
+        previous = cls.open(directory)
+        generation = f"seg-{time.time_ns()}"
+        path = os.path.join(directory, generation)
+        os.makedirs(path)
+
+        conn.execute("BEGIN")
+        try:
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM vector_log").fetchone()[0]
+            size, *lengths = conn.execute(
+                "SELECT COUNT(*), MAX(LENGTH(id)), "
+                + ", ".join(f"MAX(LENGTH({column}))" for column in SEGMENT_COLUMNS)
+                + " FROM vectors"
+            ).fetchone()
+            dtype = {None: np.float32, "float16": np.float16, "int8": np.int8}[quantize_as]
+            arrays = {"vectors": np.lib.format.open_memmap(
+                os.path.join(path, "vectors.npy"), mode="w+", dtype=dtype, shape=(size, dim))}
+            if quantize_as == "int8":
+                arrays["scales"] = np.lib.format.open_memmap(
+                    os.path.join(path, "scales.npy"), mode="w+", dtype=np.float32, shape=(size,))
+            for name, length in zip(("ids",) + SEGMENT_COLUMNS, lengths):
+                arrays[name] = np.lib.format.open_memmap(
+                    os.path.join(path, f"{name}.npy"), mode="w+", dtype=f"<U{max(length or 0, 1)}", shape=(size,))
+
+            cursor = conn.execute(
+                f"SELECT id, embedding, {', '.join(SEGMENT_COLUMNS)} FROM vectors ORDER BY id"
+            )
+            start = 0
+            while True:
+                rows = cursor.fetchmany(chunk)
+                if not rows:
+                    break
+                end = start + len(rows)
+                dense = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), dim)
+                if quantize_as:
+                    codes, scales = quantize(dense, quantize_as)
+                    arrays["vectors"][start:end] = codes
+                    if scales is not None:
+                        arrays["scales"][start:end] = scales
+                else:
+                    arrays["vectors"][start:end] = dense
+                arrays["ids"][start:end] = [row[0] for row in rows]
+                for i, column in enumerate(SEGMENT_COLUMNS):
+                    arrays[column][start:end] = ["" if row[2 + i] is None else str(row[2 + i]) for row in rows]
+                start = end
+        finally:
+            conn.rollback()
+        for array in arrays.values():
+            array.flush()
+        del arrays
+
+        # Publish: readers see either the old or the new CURRENT, never a partial one
+        meta = {"generation": generation, "seq": seq, "size": size, "quantize": quantize_as}
+        tmp_path = os.path.join(directory, "CURRENT.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(directory, "CURRENT"))
+
+        # Keep the previous generation for workers that have not switched yet;
+        # older ones (and their log entries) are no longer needed by anyone
+        keep = {generation, previous and os.path.basename(previous.path)}
+        for name in os.listdir(directory):
+            if name.startswith("seg-") and name not in keep:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        if previous is not None:
+            with conn:
+                conn.execute("DELETE FROM vector_log WHERE seq <= ?", (previous.seq,))
+        return cls(path, meta)
@@ -2,13 +2,73 @@
 import numpy as np
 import sqlite3
 import json
-from typing import List, Dict, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, List, Dict, Tuple, Optional
+from ivf_index import IVFIndex
+from quantization import QUANTIZATIONS, quantize, dequantize, scan
+from segment import VectorSegment
+
+# Metadata columns that can be used in search(where=...)
+FILTER_COLUMNS = ("type", "job_id", "created_at")
+RANGE_OPS = {"gt": np.greater, "gte": np.greater_equal, "lt": np.less, "lte": np.less_equal}
 
 class VectorDB:
-    def __init__(self, db_path: str, dim: int):
+    def __init__(self, db_path: str, dim: int, index: Optional[str] = None,
+                 nlist: int = 64, nprobe: int = 8, quantize: Optional[str] = None, rerank: int = 4,
+                 segment: bool = False):
         self.dim = dim
+        self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
         self._create_table()
+        self._migrate_columns()
+        self._migrate_json_embeddings()
+
+        # In-memory copy of the table, loaded lazily on first search.
+        # Rows of _vectors[:_size] are L2-normalized and line up with _ids
+        # and with the filterable metadata arrays in _columns.
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._row_of: Dict[str, int] = {}
+        self._size = 0
+        self._filter_cache: Dict[Any, np.ndarray] = {}
+
+        # Optional approximate index, persisted next to the SQLite file
+        if index not in (None, "ivf"):
+            raise ValueError(f"Unknown index type: {index}")
+        self.index: Optional[IVFIndex] = IVFIndex(dim, nlist=nlist, nprobe=nprobe) if index else None
+        self.index_path = f"{db_path}.ivf.npz"
+
+        # Optional quantized in-memory copy: int8 (plus a per-row scale) or float16.
+        # The table keeps float32, and the best top_k * rerank approximate hits
+        # are re-scored exactly from it; rerank=0 returns the approximate scores.
+        if quantize not in (None,) + QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantize}")
+        self.quantize = quantize
+        self.rerank = rerank
+
+        # Optional shared segment (see segment.py): the bulk of the vectors is
+        # memory-mapped from <db_path>.segment and shared by every process, only
+        # rows written since the segment was exported are held in _vectors.
+        # Writes are tracked by triggers in vector_log so every process can
+        # replay the ones that happened after its segment.
+        if segment and index:
+            raise ValueError("The IVF index is built per process; segment mode scans the shared segment")
+        self.segment = segment
+        self.segment_dir = f"{db_path}.segment"
+        self._segment: Optional[VectorSegment] = None
+        self._segment_version = None
+        self._segment_filter_cache: Dict[Any, np.ndarray] = {}
+        self._dead: set = set()  # segment rows overwritten or deleted since it was exported
+        self._log_seq = 0
+        if segment:
+            self._create_log()
+
+        # Inside batch(): commits and index updates are deferred until exit
+        self._batch_depth = 0
+        self._pending_index: Dict[str, Optional[np.ndarray]] = {}
 
     def _create_table(self):
         self.conn.execute("""
@@ -16,49 +76,507 @@ class VectorDB:
             id TEXT PRIMARY KEY,
             text TEXT,
             type TEXT,
-            embedding TEXT  -- store as JSON string
+            embedding BLOB,  -- normalized float32 vector
+            job_id TEXT,
+            created_at TEXT
         )
         """)
         self.conn.commit()
 
+    def _create_log(self):
+        with self.conn:
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS vector_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL
+            )
+            """)
+            for event, ids in (("INSERT", ("new",)), ("UPDATE", ("old", "new")), ("DELETE", ("old",))):
+                logged = " ".join(f"INSERT INTO vector_log (id) VALUES ({row}.id);" for row in ids)
+                self.conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS vectors_log_{event.lower()} AFTER {event} ON vectors "
+                    f"BEGIN {logged} END"
+                )
+
+    def _migrate_columns(self):
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(vectors)")}
+        with self.conn:
+            for column in ("job_id", "created_at"):
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE vectors ADD COLUMN {column} TEXT")
+            for column in FILTER_COLUMNS:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_vectors_{column} ON vectors({column})")
+
+    def _migrate_json_embeddings(self):
+        # Older databases stored embeddings as JSON text; rewrite them as blobs in place
+        rows = self.conn.execute(
+            "SELECT id, embedding FROM vectors WHERE typeof(embedding) = 'text'"
+        ).fetchall()
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE vectors SET embedding = ? WHERE id = ?",
+                [(self._to_blob(np.array(json.loads(emb), dtype=np.float32)), meta_id)
+                 for meta_id, emb in rows]
+            )
+
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if vec.shape[0] != self.dim:
+            raise ValueError(f"Expected embedding of dim {self.dim}, got {vec.shape[0]}")
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def _normalize_many(self, embeddings: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected embeddings of shape (N, {self.dim}), got {vectors.shape}")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1)
+
+    def _to_blob(self, embedding: np.ndarray) -> bytes:
+        return self._normalize(embedding).tobytes()
+
+    def _from_blob(self, blob: bytes) -> np.ndarray:
+        return np.frombuffer(blob, dtype=np.float32)
+
+    @contextmanager
+    def batch(self):
+        # Group writes into one transaction; the index is brought up to date on exit
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.conn.rollback()
+                self._pending_index.clear()
+                self._vectors = None  # reload from the table on next search
+                self._filter_cache.clear()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.conn.commit()
+            self._flush_index()
+
+    def _write(self, sql: str, embeddings: np.ndarray, metas: List[Dict]):
+        vectors = self._normalize_many(embeddings)
+        if len(vectors) != len(metas):
+            raise ValueError(f"Got {len(vectors)} embeddings for {len(metas)} metadata entries")
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.batch():
+            self.conn.executemany(sql, [{
+                "id": meta["id"], "text": meta["text"], "type": meta["type"], "embedding": vec.tobytes(),
+                "job_id": self._job_key(meta.get("job_id")),
+                "created_at": meta.get("created_at") or now, "new_created_at": meta.get("created_at")
+            } for meta, vec in zip(metas, vectors)])
+            for meta, vec in zip(metas, vectors):
+                self._put_row(meta["id"], vec, meta, now)
+                self._pending_index[meta["id"]] = vec
+
+    @staticmethod
+    def _job_key(job_id) -> Optional[str]:
+        # job ids arrive as ints from the app and as strings from SQLite; compare them as text
+        return None if job_id is None else str(job_id)
+
     def add(self, embedding: np.ndarray, meta: Dict):
-        emb_list = embedding.tolist()
-        self.conn.execute(
-            "INSERT OR REPLACE INTO vectors (id, text, type, embedding) VALUES (?, ?, ?, ?)",
-            (meta["id"], meta["text"], meta["type"], json.dumps(emb_list))
+        self.upsert_many(np.asarray(embedding).reshape(1, -1), [meta])
+
+    def add_many(self, embeddings: np.ndarray, metas: List[Dict]):
+        # Plain INSERT: an id that already exists fails the whole call
+        self._write(
+            """INSERT INTO vectors (id, text, type, embedding, job_id, created_at)
+            VALUES (:id, :text, :type, :embedding, :job_id, :created_at)""",
+            embeddings, metas
+        )
+
+    def upsert_many(self, embeddings: np.ndarray, metas: List[Dict]):
+        self._write(
+            """INSERT INTO vectors (id, text, type, embedding, job_id, created_at)
+            VALUES (:id, :text, :type, :embedding, :job_id, :created_at)
+            ON CONFLICT(id) DO UPDATE SET
+                text = excluded.text, type = excluded.type, embedding = excluded.embedding,
+                job_id = excluded.job_id, created_at = COALESCE(:new_created_at, created_at)""",
+            embeddings, metas
         )
-        self.conn.commit()
 
     def delete_by_id(self, meta_id: str):
-        self.conn.execute("DELETE FROM vectors WHERE id = ?", (meta_id,))
-        self.conn.commit()
+        with self.batch():
+            self.conn.execute("DELETE FROM vectors WHERE id = ?", (meta_id,))
+            self._drop_row(meta_id)
+            self._pending_index[meta_id] = None
 
     def update(self, meta_id: str, new_embedding: np.ndarray, new_meta: Dict):
-        self.delete_by_id(meta_id)
-        self.add(new_embedding, new_meta)
-
-    def _fetch_all(self):
-        cursor = self.conn.execute("SELECT id, text, type, embedding FROM vectors")
-        rows = cursor.fetchall()
-        vectors, metadata = [], []
-        for row in rows:
-            meta = {
-                "id": row[0],
-                "text": row[1],
-                "type": row[2]
-            }
-            emb = np.array(json.loads(row[3]), dtype=np.float32)
-            metadata.append(meta)
-            vectors.append(emb)
-        return vectors, metadata
-
-    def search(self, query: np.ndarray, top_k: int = 5) -> List[Tuple[float, Dict]]:
-        vectors, metadata = self._fetch_all()
-        query = query / np.linalg.norm(query)
-        results = []
-        for emb, meta in zip(vectors, metadata):
-            emb = emb / np.linalg.norm(emb)
-            sim = float(np.dot(query, emb))
-            results.append((sim, meta))
-        results.sort(reverse=True, key=lambda x: x[0])
-        return results[:top_k]
+        with self.batch():
+            if new_meta["id"] != meta_id:
+                self.delete_by_id(meta_id)
+            self.add(new_embedding, new_meta)
+
+    def _load(self):
+        if self._vectors is not None:
+            return
+        query = f"SELECT id, embedding, {', '.join(FILTER_COLUMNS)} FROM vectors"
+        params: Tuple = ()
+        if self.segment:
+            # Map the current segment and load only what was written after it.
+            # The log position is read first: a write landing in between is
+            # loaded now and replayed again later, which is harmless.
+            self._segment_version = VectorSegment.version(self.segment_dir)
+            self._segment = VectorSegment.open(self.segment_dir)
+            self._segment_filter_cache = {}
+            self._log_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM vector_log").fetchone()[0]
+            self._dead = set()
+            if self._segment is not None:
+                changed = [row[0] for row in self.conn.execute(
+                    "SELECT DISTINCT id FROM vector_log WHERE seq > ?", (self._segment.seq,)
+                )]
+                self._dead = set(self._segment.rows_of(changed).tolist())
+                query += " WHERE id IN (SELECT id FROM vector_log WHERE seq > ?)"
+                params = (self._segment.seq,)
+        rows = self.conn.execute(query, params).fetchall()
+        self._size = len(rows)
+        capacity = max(self._size, 16)
+        dtype = {None: np.float32, "float16": np.float16, "int8": np.int8}[self.quantize]
+        self._vectors = np.empty((capacity, self.dim), dtype=dtype)
+        self._scales = np.empty(capacity, dtype=np.float32) if self.quantize == "int8" else None
+        self._ids = np.empty(capacity, dtype=object)
+        self._columns = {column: np.empty(capacity, dtype=object) for column in FILTER_COLUMNS}
+        self._row_of = {}
+        self._filter_cache = {}
+        for start in range(0, self._size, 4096):
+            # Decode (and quantize) a chunk at a time so no second full float32 copy is built
+            chunk = rows[start:start + 4096]
+            dense = self._from_blob(b"".join(blob for _, blob, *_ in chunk))
+            self._store(slice(start, start + len(chunk)), dense.reshape(len(chunk), self.dim))
+        for row, (meta_id, blob, *values) in enumerate(rows):
+            self._ids[row] = meta_id
+            for column, value in zip(FILTER_COLUMNS, values):
+                self._columns[column][row] = value
+            self._row_of[meta_id] = row
+        self._load_index()
+
+    def _load_index(self):
+        if self.index is None:
+            return
+        if not self.index.is_trained:
+            self.index.load(self.index_path)
+        if self.index.is_trained:
+            # Reconcile with rows written while the index was not loaded
+            live = set(self._row_of)
+            for meta_id in set(self.index.assignment) - live:
+                self.index.remove(meta_id)
+            missing = [meta_id for meta_id in live if meta_id not in self.index.assignment]
+            self._index_add(missing, self._dense([self._row_of[i] for i in missing]))
+        else:
+            self._index_add([], self._dense(slice(0, 0)))
+
+    def _refresh(self):
+        # Catch up with other processes: remap if a new segment was published,
+        # otherwise replay the log entries written since the last search
+        if VectorSegment.version(self.segment_dir) != self._segment_version:
+            self._vectors = None
+            self._load()
+            return
+        changed = self.conn.execute(
+            "SELECT seq, id FROM vector_log WHERE seq > ? ORDER BY seq", (self._log_seq,)
+        ).fetchall()
+        if not changed:
+            return
+        self._log_seq = changed[-1][0]
+        ids = list(dict.fromkeys(meta_id for _, meta_id in changed))
+        placeholders = ",".join("?" * len(ids))
+        current = {row[0]: row for row in self.conn.execute(
+            f"SELECT id, embedding, {', '.join(FILTER_COLUMNS)} FROM vectors WHERE id IN ({placeholders})", ids
+        )}
+        for meta_id in ids:
+            if meta_id in current:
+                _, blob, *values = current[meta_id]
+                self._put_row(meta_id, self._from_blob(blob), dict(zip(FILTER_COLUMNS, values)), values[-1])
+            else:
+                self._drop_row(meta_id)
+
+    def export_segment(self) -> VectorSegment:
+        # Compact the table (and everything in the log) into a new shared
+        # segment and publish it; processes in segment mode switch on their next search
+        if self._batch_depth:
+            raise RuntimeError("Cannot export a segment inside batch()")
+        self.conn.commit()
+        self._create_log()
+        segment = VectorSegment.write(self.segment_dir, self.conn, self.dim, self.quantize)
+        if self.segment:
+            self._vectors = None
+        return segment
+
+    def _flush_index(self):
+        pending, self._pending_index = self._pending_index, {}
+        if self.index is None:
+            return
+        self._load()
+        for meta_id in pending:
+            self.index.remove(meta_id)
+        added = [(meta_id, vec) for meta_id, vec in pending.items() if vec is not None]
+        if added:
+            self._index_add([meta_id for meta_id, _ in added], np.stack([vec for _, vec in added]))
+
+    def _index_add(self, ids: List[str], vectors: np.ndarray):
+        if self.index is None or self._vectors is None:
+            return
+        if self.index.is_trained:
+            self.index.add_many(vectors, ids)
+        elif self._size >= self.index.nlist * 4:
+            # Enough data to cluster; train on everything stored so far
+            self.rebuild_index()
+
+    def rebuild_index(self):
+        if self.index is None:
+            return
+        self._load()
+        self.index.train(self._dense(slice(0, self._size)), list(self._ids[:self._size]))
+        self.save_index()
+
+    def save_index(self):
+        if self.index is not None and self.index.is_trained:
+            self.index.save(self.index_path)
+
+    def close(self):
+        self.save_index()
+        self.conn.close()
+
+    def _store(self, rows, vectors: np.ndarray):
+        # Write normalized float32 rows into the scan matrix, quantizing if enabled
+        if not self.quantize:
+            self._vectors[rows] = vectors
+            return
+        codes, scales = quantize(vectors, self.quantize)
+        self._vectors[rows] = codes
+        if scales is not None:
+            self._scales[rows] = scales
+
+    def _dense(self, rows) -> np.ndarray:
+        # float32 rows of the scan matrix (approximate when quantized)
+        if not self.quantize:
+            return self._vectors[rows]
+        return dequantize(self._vectors[rows], None if self._scales is None else self._scales[rows])
+
+    @property
+    def nbytes(self) -> int:
+        # Memory scanned per query: the live rows of the matrix plus int8 scales
+        if self._vectors is None:
+            return 0
+        return self._vectors[:self._size].nbytes + (0 if self._scales is None else self._scales[:self._size].nbytes)
+
+    def _grow(self, array: np.ndarray) -> np.ndarray:
+        grown = np.empty((self._size * 2,) + array.shape[1:], dtype=array.dtype)
+        grown[:self._size] = array[:self._size]
+        return grown
+
+    def _put_row(self, meta_id: str, vec: np.ndarray, meta: Dict, now: str):
+        # Keep the loaded matrix in sync; nothing to do until the first search loads it
+        if self._vectors is None:
+            return
+        self._kill_segment_row(meta_id)
+        self._filter_cache.clear()
+        row = self._row_of.get(meta_id)
+        if row is None:
+            if self._size == self._vectors.shape[0]:
+                self._vectors = self._grow(self._vectors)
+                if self._scales is not None:
+                    self._scales = self._grow(self._scales)
+                self._ids = self._grow(self._ids)
+                self._columns = {column: self._grow(values) for column, values in self._columns.items()}
+            row = self._size
+            self._size += 1
+            self._ids[row] = meta_id
+            self._row_of[meta_id] = row
+            self._columns["created_at"][row] = meta.get("created_at") or now
+        elif meta.get("created_at"):
+            self._columns["created_at"][row] = meta["created_at"]
+        self._store(slice(row, row + 1), vec.reshape(1, -1))
+        self._columns["type"][row] = meta["type"]
+        self._columns["job_id"][row] = self._job_key(meta.get("job_id"))
+
+    def _kill_segment_row(self, meta_id: str):
+        if self._segment is not None:
+            self._dead.update(self._segment.rows_of([meta_id]).tolist())
+
+    def _drop_row(self, meta_id: str):
+        if self._vectors is not None:
+            self._kill_segment_row(meta_id)
+        if self._vectors is None or meta_id not in self._row_of:
+            return
+        # Move the last row into the hole so the live rows stay contiguous
+        self._filter_cache.clear()
+        row = self._row_of.pop(meta_id)
+        last = self._size - 1
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            if self._scales is not None:
+                self._scales[row] = self._scales[last]
+            self._ids[row] = self._ids[last]
+            for values in self._columns.values():
+                values[row] = values[last]
+            self._row_of[self._ids[row]] = row
+        self._ids[last] = None
+        self._size = last
+
+    def _fetch_meta(self, ids: List[str]) -> Dict[str, Dict]:
+        placeholders = ",".join("?" * len(ids))
+        cursor = self.conn.execute(
+            f"SELECT id, text, type, job_id, created_at FROM vectors WHERE id IN ({placeholders})", ids
+        )
+        return {
+            row[0]: {"id": row[0], "text": row[1], "type": row[2], "job_id": row[3], "created_at": row[4]}
+            for row in cursor
+        }
+
+    def _scan(self, rows, query: np.ndarray) -> np.ndarray:
+        if not self.quantize:
+            return self._vectors[rows] @ query
+        return scan(self._vectors[rows], None if self._scales is None else self._scales[rows], query)
+
+    def _exact_scores(self, ids: List[str], query: np.ndarray) -> np.ndarray:
+        # Re-score ids against the float32 embeddings kept in the table
+        # (-inf for an id another process deleted since our last refresh)
+        placeholders = ",".join("?" * len(ids))
+        blobs = dict(self.conn.execute(
+            f"SELECT id, embedding FROM vectors WHERE id IN ({placeholders})", ids
+        ))
+        scores = np.full(len(ids), -np.inf, dtype=np.float32)
+        found = [i for i, meta_id in enumerate(ids) if meta_id in blobs]
+        if found:
+            vectors = np.frombuffer(b"".join(blobs[ids[i]] for i in found), dtype=np.float32)
+            scores[found] = vectors.reshape(len(found), self.dim) @ query
+        return scores
+
+    def _column_mask(self, values: np.ndarray, present: np.ndarray, column: str, cond: Any) -> np.ndarray:
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot filter on '{column}', expected one of {FILTER_COLUMNS}")
+        normalize = self._job_key if column == "job_id" else (lambda v: v)
+        if isinstance(cond, dict):
+            # Range filter, e.g. {"created_at": {"gte": "2024-01-01"}}
+            mask = present.copy()
+            for op, bound in cond.items():
+                if op not in RANGE_OPS:
+                    raise ValueError(f"Unknown range operator '{op}', expected one of {tuple(RANGE_OPS)}")
+                in_range = np.zeros(len(values), dtype=bool)
+                in_range[present] = RANGE_OPS[op](values[present], normalize(bound)).astype(bool)
+                mask &= in_range
+            return mask
+        if isinstance(cond, (list, tuple, set)):
+            return np.isin(values, [normalize(v) for v in cond])
+        return values == normalize(cond)
+
+    def _filter_mask(self, where: Dict[str, Any]) -> np.ndarray:
+        # Boolean mask over the live rows; cached per filter until the next write
+        key = tuple(sorted((column, repr(cond)) for column, cond in where.items()))
+        mask = self._filter_cache.get(key)
+        if mask is not None:
+            return mask
+        mask = np.ones(self._size, dtype=bool)
+        for column, cond in where.items():
+            values = self._columns.get(column, np.empty(0, dtype=object))[:self._size]
+            mask &= self._column_mask(values, np.not_equal(values, None), column, cond)
+        self._filter_cache[key] = mask
+        return mask
+
+    def _segment_mask(self, where: Dict[str, Any]) -> np.ndarray:
+        # Same over the segment rows, where NULL is stored as ''; cached until the segment changes
+        key = tuple(sorted((column, repr(cond)) for column, cond in where.items()))
+        mask = self._segment_filter_cache.get(key)
+        if mask is not None:
+            return mask
+        mask = np.ones(self._segment.size, dtype=bool)
+        for column, cond in where.items():
+            values = self._segment.columns[column] if column in FILTER_COLUMNS else np.empty(0)
+            mask &= self._column_mask(values, values != "", column, cond)
+        self._segment_filter_cache[key] = mask
+        return mask
+
+    def _candidate_rows(self, query: np.ndarray, top_k: int, nprobe: Optional[int]) -> Optional[np.ndarray]:
+        if self.index is None or not self.index.is_trained:
+            return None
+        ids = self.index.candidates(query, nprobe)
+        if self._pending_index:
+            # Inside a batch the index only catches up on exit: drop ids deleted
+            # since, and scan the ids written since along with the candidates
+            ids = [i for i in dict.fromkeys(list(ids) + list(self._pending_index)) if i in self._row_of]
+        if len(ids) < top_k:
+            return None  # too few candidates in the probed lists, scan everything
+        return np.fromiter((self._row_of[i] for i in ids), dtype=np.int64, count=len(ids))
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        k = min(k, len(scores))
+        return np.argpartition(-scores, k - 1)[:k] if k else np.empty(0, dtype=np.int64)
+
+    def _search_rows(self, query: np.ndarray, n: int, where: Optional[Dict[str, Any]],
+                     nprobe: Optional[int], exact: bool) -> Tuple[List[str], np.ndarray]:
+        # Best n (id, score) pairs among the rows held in _vectors
+        if self._size == 0:
+            return [], np.empty(0, dtype=np.float32)
+        mask = self._filter_mask(where) if where else None
+        rows = None if exact else self._candidate_rows(query, n, nprobe)
+        if rows is not None and mask is not None:
+            rows = rows[mask[rows]]
+            if len(rows) < n:
+                rows = None
+        if rows is None and mask is not None:
+            rows = np.flatnonzero(mask)
+        if rows is None:
+            rows = np.arange(self._size)
+            scores = self._scan(slice(0, self._size), query)
+        else:
+            scores = self._scan(rows, query)
+        top = self._top(scores, n)
+        return [self._ids[rows[i]] for i in top], scores[top]
+
+    def _search_segment(self, query: np.ndarray, n: int,
+                        where: Optional[Dict[str, Any]]) -> Tuple[List[str], np.ndarray]:
+        # Best n (id, score) pairs among the live rows of the shared segment
+        segment = self._segment
+        if segment is None or segment.size == 0:
+            return [], np.empty(0, dtype=np.float32)
+        rows = None
+        if where:
+            allowed = self._segment_mask(where)
+            if self._dead:
+                allowed = allowed.copy()
+                allowed[list(self._dead)] = False
+            rows = np.flatnonzero(allowed)
+        vectors = segment.vectors if rows is None else segment.vectors[rows]
+        scales = segment.scales if rows is None or segment.scales is None else segment.scales[rows]
+        scores = scan(vectors, scales, query) if segment.quantize else vectors @ query
+        if rows is None:
+            rows = np.arange(segment.size)
+            if self._dead:
+                scores[list(self._dead)] = -np.inf
+        top = self._top(scores, n)
+        top = top[np.isfinite(scores[top])]
+        return [str(segment.ids[rows[i]]) for i in top], scores[top]
+
+    def search(self, query: np.ndarray, top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+               nprobe: Optional[int] = None, exact: bool = False) -> List[Tuple[float, Dict]]:
+        self._load()
+        if self.segment:
+            self._refresh()
+        if top_k <= 0:
+            return []
+        query = self._normalize(query)
+        # Quantized scores only shortlist top_k * rerank ids; those are re-scored exactly
+        quantized = self.quantize or (self._segment is not None and self._segment.quantize)
+        n = top_k * self.rerank if quantized and self.rerank else top_k
+        ids, scores = self._search_rows(query, n, where, nprobe, exact)
+        if self._segment is not None:
+            segment_ids, segment_scores = self._search_segment(query, n, where)
+            ids, scores = ids + segment_ids, np.concatenate([scores, segment_scores])
+        if not ids:
+            return []
+        if n > top_k:
+            scores = self._exact_scores(ids, query)
+        top = self._top(scores, top_k)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[np.isfinite(scores[top])]
+        ids = [ids[i] for i in top]
+        metadata = self._fetch_meta(ids) if ids else {}
+        return [(float(scores[i]), metadata[meta_id]) for i, meta_id in zip(top, ids) if meta_id in metadata]
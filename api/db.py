@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+import metrics
+
+# Data-access helpers shared by routes, pipeline stages and caches.
+# Each thread keeps one open connection per database file, so prepared
+# statements stay cached and pragmas are applied once. WAL lets readers
+# (/api/jobs, /api/applications) run while a pipeline stage is writing.
+
+_local = threading.local()
+
+def _open(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=Config.SQLITE_BUSY_TIMEOUT_SECONDS,
+        cached_statements=Config.SQLITE_CACHED_STATEMENTS
+    )
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}')
+    conn.execute(f'PRAGMA cache_size={-int(Config.SQLITE_CACHE_KB)}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+def get_connection(path=None):
+    # The calling thread's connection; reads run in autocommit mode
+    path = path or Config.DATABASE_FILE
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = _open(path)
+    return conn
+
+@contextmanager
+def transaction(path=None):
+    # Short write transaction: take the write lock up front and commit on
+    # exit (rollback on error). Nested use joins the outer transaction.
+    conn = get_connection(path)
+    if conn.in_transaction:
+        yield conn
+        return
+    start = time.perf_counter()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    with metrics.timed('db_commit_seconds'):
+        conn.commit()
+    metrics.observe('db_transaction_seconds', time.perf_counter() - start)
+
+def release():
+    # End of a request or task: never leave a transaction open on a pooled connection
+    for conn in getattr(_local, 'connections', {}).values():
+        if conn.in_transaction:
+            conn.rollback()
+
+def close_all():
+    for conn in getattr(_local, 'connections', {}).values():
+        conn.close()
+    _local.connections = {}
@@ -0,0 +1,272 @@
+"""Shared embedding server: loads the sentence-transformer once and serves every
+Flask worker over a Unix socket, micro-batching concurrent encode requests."""
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from config import Config
+import metrics
+
+# Wire format, both directions: 8-byte header (JSON length, payload length,
+# big-endian) then the JSON and the payload. Requests carry {"texts": [...]};
+# responses carry {"model": name, "rows": n, "dim": d} and n * d float32 values,
+# or {"error": ...}. A connection serves any number of requests, one at a time.
+
+FRAME = struct.Struct('>II')
+
+class EmbeddingServerError(Exception):
+    pass
+
+def _send(stream, header, payload=b''):
+    data = json.dumps(header).encode('utf-8')
+    stream.write(FRAME.pack(len(data), len(payload)) + data + payload)
+    stream.flush()
+
+def _read(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ConnectionError('Embedding server connection closed')
+    return data
+
+def _receive(stream):
+    # (header, payload), or None if the peer closed the connection between frames
+    prefix = stream.read(FRAME.size)
+    if not prefix:
+        return None
+    if len(prefix) != FRAME.size:
+        raise ConnectionError('Embedding server connection closed')
+    header_size, payload_size = FRAME.unpack(prefix)
+    header = json.loads(_read(stream, header_size))
+    return header, _read(stream, payload_size) if payload_size else b''
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # every worker thread may connect at once
+
+class EmbeddingServer:
+    # Requests from all connections go through one queue. The batcher takes
+    # the first waiting request, keeps collecting for up to batch_window
+    # seconds (or until max_batch texts), encodes everything in one model
+    # call and hands each request its rows back.
+
+    def __init__(self, model, socket_path, batch_window=None, max_batch=None, model_name=None):
+        self.model = model
+        self.model_name = model_name or Config.EMBEDDING_MODEL_NAME
+        self.socket_path = socket_path
+        self.batch_window = batch_window if batch_window is not None else Config.EMBEDDING_SERVER_BATCH_WINDOW_MS / 1000
+        self.max_batch = max_batch or Config.EMBEDDING_SERVER_MAX_BATCH
+        self.requests = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._server = None
+
+    def submit(self, texts):
+        future = Future()
+        self._queue.put((texts, future))
+        return future
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            count = len(batch[0][0])
+            deadline = time.monotonic() + self.batch_window
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                count += len(batch[-1][0])
+
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                vectors = np.asarray(self.model.encode(texts, batch_size=self.max_batch), dtype=np.float32)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.requests += len(batch)
+            self.batches += 1
+            start = 0
+            for request_texts, future in batch:
+                future.set_result(vectors[start:start + len(request_texts)])
+                start += len(request_texts)
+
+    def _handler(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        message = _receive(self.rfile)
+                    except (ConnectionError, ValueError):
+                        return
+                    if message is None:
+                        return
+                    texts = message[0].get('texts') or []
+                    try:
+                        vectors = server.submit(texts).result() if texts else np.empty((0, 0), dtype=np.float32)
+                    except Exception as e:
+                        _send(self.wfile, {'error': str(e)})
+                        continue
+                    rows, dim = vectors.shape if vectors.ndim == 2 else (0, 0)
+                    _send(self.wfile, {'model': server.model_name, 'rows': rows, 'dim': dim},
+                          np.ascontiguousarray(vectors).tobytes())
+
+        return Handler
+
+    def _claim_socket(self):
+        # Replace a stale socket file, but never steal one a live server is using
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise EmbeddingServerError(f'An embedding server is already listening on {self.socket_path}')
+        finally:
+            probe.close()
+
+    def serve_forever(self):
+        self._claim_socket()
+        threading.Thread(target=self._batch_loop, name='embedding-batcher', daemon=True).start()
+        self._server = _UnixServer(self.socket_path, self._handler())
+        os.chmod(self.socket_path, 0o600)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+class EmbeddingClient:
+    # Drop-in for the model's encode() in the Flask workers. Each thread keeps
+    # its own connection to the server; if the server is missing, fails or
+    # serves a different model than model_name (the embedding cache key), the
+    # call falls back to the in-process model (loaded on first use) and the
+    # server is not tried again for retry_seconds.
+
+    def __init__(self, socket_path, fallback, model_name=None, timeout=None, retry_seconds=None):
+        self.socket_path = socket_path
+        self.fallback = fallback
+        self.model_name = model_name or Config.EMBEDDING_MODEL_NAME
+        self.timeout = timeout or Config.EMBEDDING_SERVER_TIMEOUT_SECONDS
+        self.retry_seconds = retry_seconds if retry_seconds is not None else Config.EMBEDDING_SERVER_RETRY_SECONDS
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _stream(self):
+        stream = getattr(self._local, 'stream', None)
+        if stream is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+            stream = self._local.stream = sock.makefile('rwb')
+        return stream
+
+    def _close(self):
+        stream = getattr(self._local, 'stream', None)
+        if stream is not None:
+            try:
+                stream.close()
+                self._local.sock.close()
+            except OSError:
+                pass
+        self._local.stream = self._local.sock = None
+
+    def _remote(self, texts):
+        # One retry on a fresh connection: the server may have restarted since this thread last used it
+        for attempt in range(2):
+            try:
+                stream = self._stream()
+                _send(stream, {'texts': texts})
+                message = _receive(stream)
+                if message is None:
+                    raise ConnectionError('Embedding server connection closed')
+                break
+            except OSError:
+                self._close()
+                if attempt:
+                    raise
+        header, payload = message
+        if 'error' in header:
+            raise EmbeddingServerError(header['error'])
+        if header.get('model') != self.model_name:
+            raise EmbeddingServerError(f"Server serves {header.get('model')}, expected {self.model_name}")
+        return np.frombuffer(payload, dtype=np.float32).reshape(header['rows'], header['dim'])
+
+    @property
+    def available(self):
+        return bool(self.socket_path) and hasattr(socket, 'AF_UNIX') and time.monotonic() >= self._down_until
+
+    def ping(self):
+        # True if the server answers; used at startup to decide whether to load the local model
+        if not self.available:
+            return False
+        try:
+            self._remote([])
+            return True
+        except (OSError, EmbeddingServerError, ValueError):
+            self._close()
+            return False
+
+    def encode(self, texts, batch_size=64, **kwargs):
+        texts = list(texts)
+        if self.available:
+            try:
+                vectors = self._remote(texts)
+                metrics.inc('embedding_server_requests_total', result='remote')
+                return vectors
+            except (OSError, EmbeddingServerError, ValueError) as e:
+                self._close()
+                self._down_until = time.monotonic() + self.retry_seconds
+                if not isinstance(e, FileNotFoundError):  # no server deployed is not worth a log line
+                    print(f"Embedding server unavailable ({e}), encoding in-process")
+        metrics.inc('embedding_server_requests_total', result='fallback')
+        return self.fallback().encode(texts, batch_size=batch_size, **kwargs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--socket', default=Config.EMBEDDING_SERVER_SOCKET)
+    parser.add_argument('--model', default=Config.EMBEDDING_MODEL_NAME)
+    parser.add_argument('--window-ms', type=float, default=Config.EMBEDDING_SERVER_BATCH_WINDOW_MS)
+    parser.add_argument('--max-batch', type=int, default=Config.EMBEDDING_SERVER_MAX_BATCH)
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(args.model)
+    os.makedirs(os.path.dirname(os.path.abspath(args.socket)), exist_ok=True)
+    server = EmbeddingServer(model, args.socket, args.window_ms / 1000, args.max_batch, model_name=args.model)
+    print(f"Serving {args.model} on {args.socket}")
+    # Exit through serve_forever's cleanup (removing the socket file) on SIGTERM too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
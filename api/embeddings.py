@@ -0,0 +1,84 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from config import Config
+import db
+import metrics
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    # Content-addressed cache in front of a SentenceTransformer model.
+    # Lookups go through an in-process LRU, then the embedding_cache table;
+    # only texts missing from both are encoded, in batches. get_model is
+    # called only when something has to be encoded, so the model loads lazily.
+
+    def __init__(self, get_model, model_name, db_file=None, lru_size=4096, batch_size=64):
+        self.get_model = get_model
+        self.model_name = model_name
+        self.db_file = db_file or Config.DATABASE_FILE
+        self.lru_size = lru_size
+        self.batch_size = batch_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lru_get(self, key):
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+            return vector
+
+    def _lru_put(self, key, vector):
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def encode(self, texts):
+        # Returns a (len(texts), dim) float32 array in input order
+        keys = [text_hash(text) for text in texts]
+        vectors = {key: self._lru_get(key) for key in set(keys)}
+
+        missing = [key for key, vector in vectors.items() if vector is None]
+        metrics.inc('embedding_cache_requests_total', len(vectors) - len(missing), source='lru')
+        if missing:
+            conn = db.get_connection(self.db_file)
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = conn.execute(f'''
+                    SELECT text_hash, embedding FROM embedding_cache
+                    WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})
+                ''', (self.model_name, *chunk)).fetchall()
+                for key, blob in rows:
+                    vectors[key] = np.frombuffer(blob, dtype=np.float32)
+                    self._lru_put(key, vectors[key])
+                metrics.inc('embedding_cache_requests_total', len(rows), source='db')
+
+            # Encode whatever is still missing, each distinct text once
+            to_encode = {}
+            for key, text in zip(keys, texts):
+                if vectors[key] is None:
+                    to_encode.setdefault(key, text)
+            if to_encode:
+                model = self.get_model()
+                with metrics.timed('embedding_encode_seconds'):
+                    encoded = np.asarray(model.encode(
+                        list(to_encode.values()), batch_size=self.batch_size
+                    ), dtype=np.float32)
+                metrics.inc('embedding_cache_requests_total', len(to_encode), source='encoded')
+                with db.transaction(self.db_file) as conn:
+                    conn.executemany('''
+                        INSERT OR REPLACE INTO embedding_cache (model, text_hash, embedding)
+                        VALUES (?, ?, ?)
+                    ''', [(self.model_name, key, vector.tobytes()) for key, vector in zip(to_encode, encoded)])
+                for key, vector in zip(to_encode, encoded):
+                    vectors[key] = vector
+                    self._lru_put(key, vector)
+
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
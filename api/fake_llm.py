@@ -0,0 +1,77 @@
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import deque
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+class FakeServerError(Exception):
+    status_code = 503
+
+class FakeLLM:
+    # Local stand-in for the Groq chains: deterministic output, configurable
+    # latency, and the provider's failure modes (429 past a requests-per-minute
+    # limit, random 5xx). Exposes both the LLMChain .run() and the structured
+    # .invoke() interfaces used by routes.py.
+
+    def __init__(self, latency=0.05, jitter=0.0, requests_per_minute=None, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests_per_minute = requests_per_minute
+        self.error_rate = error_rate
+        self.calls = 0
+        self.rejected = 0
+        self._recent = deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _request(self):
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            if self.requests_per_minute:
+                while self._recent and now - self._recent[0] > 60:
+                    self._recent.popleft()
+                if len(self._recent) >= self.requests_per_minute:
+                    self.rejected += 1
+                    raise FakeRateLimitError('Rate limit reached')
+                self._recent.append(now)
+            failed = self._random.random() < self.error_rate
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        time.sleep(delay)
+        if failed:
+            raise FakeServerError('Service unavailable')
+
+    @staticmethod
+    def _digest(text):
+        return int(hashlib.sha256(text.encode('utf-8')).hexdigest(), 16)
+
+    def run(self, **kwargs):
+        self._request()
+        text = ' '.join(str(value) for value in kwargs.values())
+        words = text.split()
+        return '- Summary: ' + ' '.join(words[:60])
+
+    @classmethod
+    def _scores(cls, text):
+        digest = cls._digest(text)
+        return {
+            'experience_score': digest % 101,
+            'skills_score': (digest // 101) % 101,
+            'education_score': (digest // 101 ** 2) % 101,
+            'other_score': (digest // 101 ** 3) % 101
+        }
+
+    def invoke(self, prompt):
+        self._request()
+        return self._scores(str(prompt))
+
+    def invoke_batch(self, prompt):
+        # Structured output of batch_match_prompt: one entry per "Candidate ID:"
+        self._request()
+        prompt = str(prompt)
+        ids = re.findall(r'Candidate ID: (\S+)', prompt)
+        return {'scores': [dict(self._scores(f'{prompt}:{i}'), candidate_id=i) for i in ids]}
@@ -0,0 +1,80 @@
+import numpy as np
+import db
+from config import Config
+from ranking import parse_embeddings, fuse_scores, top_per_group
+from lexical import lexical_scorer
+
+# Hybrid candidate retrieval. Every application with a resume summary is
+# scored against the job it applied to twice: lexically (corpus TF-IDF) and
+# semantically (MiniLM cosine). The two are fused per job, by reciprocal rank
+# or weighted sum, and the top N per job form the shortlist that
+# compute-matches sends to the LLM. The pipeline stages keep the lexical
+# scorer in sync with the database; read paths only re-sync when rows were
+# added or removed.
+
+def hybrid_scores(job_ids=None, method=None, sync=False):
+    # Returns (application ids, their job ids, lexical, semantic, fused) arrays
+    conn = db.get_connection()
+    job_filter = ''
+    params = []
+    if job_ids is not None:
+        job_ids = list(job_ids)
+        if not job_ids:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty.astype(np.int64), empty, empty, empty
+        job_filter = f" AND job_id IN ({','.join('?' * len(job_ids))})"
+        params = job_ids
+    applications = conn.execute(f'''
+        SELECT id, job_id, embedding FROM applications
+        WHERE extracted_data IS NOT NULL{job_filter}
+    ''', params).fetchall()
+    jobs = conn.execute('SELECT id, embedding FROM jobs WHERE embedding IS NOT NULL').fetchall()
+
+    app_ids = np.array([app[0] for app in applications], dtype=np.int64)
+    app_job_ids = np.array([app[1] for app in applications], dtype=np.int64)
+
+    # Semantic: row-wise cosine of each application and its job, NaN when either embedding is missing
+    semantic = np.full(len(applications), np.nan, dtype=np.float32)
+    job_matrix, valid_jobs = parse_embeddings([job[1] for job in jobs])
+    job_row = {jobs[i][0]: row for row, i in enumerate(valid_jobs)}
+    with_embedding = [i for i, app in enumerate(applications) if app[2] and app[1] in job_row]
+    app_matrix, valid_apps = parse_embeddings([applications[i][2] for i in with_embedding])
+    if len(valid_apps) and app_matrix.shape[1] == job_matrix.shape[1]:
+        positions = np.array(with_embedding, dtype=np.int64)[valid_apps]
+        rows = np.array([job_row[applications[i][1]] for i in positions], dtype=np.int64)
+        semantic[positions] = np.einsum('ij,ij->i', app_matrix, job_matrix[rows])
+
+    # Lexical: corpus TF-IDF cosine of the resume summary and the job description
+    if sync:
+        lexical_scorer.sync()
+    else:
+        lexical_scorer.sync_if_changed()
+    lexical = lexical_scorer.score_pairs(app_job_ids.tolist(), app_ids.tolist())
+
+    groups = np.unique(app_job_ids, return_inverse=True)[1] if len(app_ids) else app_job_ids
+    fused = fuse_scores(
+        [lexical, semantic], groups,
+        method=method or Config.HYBRID_FUSION,
+        weights=[Config.HYBRID_LEXICAL_WEIGHT, Config.HYBRID_SEMANTIC_WEIGHT],
+        rrf_k=Config.HYBRID_RRF_K
+    )
+    return app_ids, app_job_ids, lexical, semantic, fused
+
+def shortlist(top_n, job_ids=None, method=None, sync=False):
+    # {job_id: [(application_id, fused, lexical, semantic), ...]} best first, top_n per job
+    app_ids, app_job_ids, lexical, semantic, fused = hybrid_scores(job_ids, method, sync)
+    if not len(app_ids):
+        return {}
+    groups = np.unique(app_job_ids, return_inverse=True)[1]
+    keep = top_per_group(fused, groups, top_n)
+    keep = keep[np.lexsort((-fused[keep], app_job_ids[keep]))]
+
+    def score(value):
+        return None if np.isnan(value) else float(value)
+
+    result = {}
+    for i in keep:
+        result.setdefault(int(app_job_ids[i]), []).append(
+            (int(app_ids[i]), float(fused[i]), score(lexical[i]), score(semantic[i]))
+        )
+    return result
@@ -0,0 +1,66 @@
+from embeddings import text_hash
+
+# Incremental job upload. A CSV row is matched to an existing job by title
+# and description hash; failing that, by title alone (the description was
+# edited). Only an edited description clears the job's summary and embedding,
+# so re-uploading the same file costs no LLM calls. Jobs missing from the
+# file are kept, so applications never point at a deleted job.
+
+def parse_job_row(row):
+    return (
+        row['Job Title'],
+        row['Job Description'],
+        float(row.get('Threshold') or 10),
+        int(row.get('Max Candidates') or 5)
+    )
+
+def upsert_jobs(conn, rows):
+    # rows: (title, description, threshold, max_candidates); call inside a transaction
+    existing = {}
+    for job_id, title, description, description_hash, threshold, max_candidates in conn.execute('''
+        SELECT id, title, description, description_hash, threshold, max_candidates FROM jobs ORDER BY id
+    '''):
+        existing.setdefault(title, []).append({
+            'id': job_id,
+            'hash': description_hash or text_hash(description),
+            'threshold': threshold,
+            'max_candidates': max_candidates
+        })
+
+    inserts, description_updates, setting_updates = [], [], []
+    unchanged = 0
+    for title, description, threshold, max_candidates in rows:
+        description_hash = text_hash(description)
+        candidates = existing.get(title, [])
+        # Each existing job matches at most one row, so duplicated titles pair up in order
+        job = next((job for job in candidates if job['hash'] == description_hash), None) \
+            or (candidates[0] if candidates else None)
+        if job is None:
+            inserts.append((title, description, description_hash, threshold, max_candidates))
+            continue
+        candidates.remove(job)
+        if job['hash'] != description_hash:
+            description_updates.append((description, description_hash, threshold, max_candidates, job['id']))
+        elif (job['threshold'], job['max_candidates']) != (threshold, max_candidates):
+            setting_updates.append((description_hash, threshold, max_candidates, job['id']))
+        else:
+            unchanged += 1
+
+    conn.executemany('''
+        INSERT INTO jobs (title, description, description_hash, threshold, max_candidates)
+        VALUES (?, ?, ?, ?, ?)
+    ''', inserts)
+    conn.executemany('''
+        UPDATE jobs
+        SET description = ?, description_hash = ?, threshold = ?, max_candidates = ?,
+            summary = NULL, embedding = NULL
+        WHERE id = ?
+    ''', description_updates)
+    conn.executemany('''
+        UPDATE jobs SET description_hash = ?, threshold = ?, max_candidates = ? WHERE id = ?
+    ''', setting_updates)
+    return {
+        'inserted': len(inserts),
+        'updated': len(description_updates) + len(setting_updates),
+        'unchanged': unchanged
+    }
@@ -0,0 +1,187 @@
+import threading
+import numpy as np
+import db
+from embeddings import text_hash
+
+# Corpus-level TF-IDF scorer. The vocabulary and IDF are fitted once over all
+# job descriptions and resume summaries, and every document's TF-IDF row is
+# kept in a sparse matrix, so scoring a job against all applications is one
+# sparse product. New or edited documents are transformed with the fitted
+# vocabulary and appended; once enough of the corpus has changed since the
+# last fit, the next update refits from scratch (which also drops stale rows).
+
+class LexicalScorer:
+    def __init__(self, refit_ratio=0.2, min_df=1, max_features=None):
+        self.refit_ratio = refit_ratio
+        self.min_df = min_df
+        self.max_features = max_features
+        self.vectorizer = None
+        self._texts = {'job': {}, 'application': {}}
+        self._hashes = {'job': {}, 'application': {}}
+        self._matrix = {'job': None, 'application': None}
+        self._row_of = {'job': {}, 'application': {}}
+        self._fitted_docs = 0
+        self._changed_docs = 0
+        self._synced_marker = None
+        self._lock = threading.RLock()
+
+    @property
+    def fitted(self):
+        return self.vectorizer is not None
+
+    def fit(self, jobs, applications):
+        # jobs / applications: {id: text}
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        with self._lock:
+            documents = {'job': dict(jobs), 'application': dict(applications)}
+            corpus = list(documents['job'].values()) + list(documents['application'].values())
+            vectorizer = TfidfVectorizer(
+                stop_words='english', sublinear_tf=True, dtype=np.float32,
+                min_df=self.min_df, max_features=self.max_features
+            )
+            try:
+                matrix = vectorizer.fit_transform(corpus).tocsr()
+            except ValueError:
+                # Empty corpus or nothing but stop words: nothing to score yet
+                self.vectorizer = None
+                return self
+            self.vectorizer = vectorizer
+            split = len(documents['job'])
+            for kind, rows in (('job', matrix[:split]), ('application', matrix[split:])):
+                self._texts[kind] = documents[kind]
+                self._hashes[kind] = {doc_id: text_hash(text) for doc_id, text in documents[kind].items()}
+                self._matrix[kind] = rows
+                self._row_of[kind] = {doc_id: i for i, doc_id in enumerate(documents[kind])}
+            self._fitted_docs = len(corpus)
+            self._changed_docs = 0
+            return self
+
+    def update(self, jobs=None, applications=None):
+        # Add new or edited documents; unchanged texts are skipped
+        from scipy.sparse import vstack
+
+        with self._lock:
+            changes = {
+                'job': {i: t for i, t in (jobs or {}).items() if self._hashes['job'].get(i) != text_hash(t)},
+                'application': {
+                    i: t for i, t in (applications or {}).items()
+                    if self._hashes['application'].get(i) != text_hash(t)
+                }
+            }
+            changed = sum(len(docs) for docs in changes.values())
+            if not changed:
+                return 0
+            for kind, docs in changes.items():
+                self._texts[kind].update(docs)
+            if not self.fitted or self._changed_docs + changed > self.refit_ratio * self._fitted_docs:
+                self.fit(self._texts['job'], self._texts['application'])
+                return changed
+
+            for kind, docs in changes.items():
+                if not docs:
+                    continue
+                # Edited documents get a new row; the old one is unreachable until the next refit
+                rows = self.vectorizer.transform(list(docs.values())).tocsr()
+                offset = self._matrix[kind].shape[0]
+                self._matrix[kind] = vstack([self._matrix[kind], rows], format='csr')
+                for i, (doc_id, text) in enumerate(docs.items()):
+                    self._row_of[kind][doc_id] = offset + i
+                    self._hashes[kind][doc_id] = text_hash(text)
+            self._changed_docs += changed
+            return changed
+
+    def remove(self, job_ids=(), application_ids=()):
+        with self._lock:
+            for kind, ids in (('job', job_ids), ('application', application_ids)):
+                for doc_id in ids:
+                    self._texts[kind].pop(doc_id, None)
+                    self._hashes[kind].pop(doc_id, None)
+                    self._row_of[kind].pop(doc_id, None)
+
+    def _rows(self, kind, ids):
+        rows = [self._row_of[kind].get(doc_id) for doc_id in ids]
+        known = np.array([row is not None for row in rows], dtype=bool)
+        return np.array([row for row in rows if row is not None], dtype=np.int64), known
+
+    def score(self, job_ids, application_ids):
+        # Cosine similarities, shape (len(job_ids), len(application_ids));
+        # ids the scorer hasn't seen score 0
+        job_ids, application_ids = list(job_ids), list(application_ids)
+        scores = np.zeros((len(job_ids), len(application_ids)), dtype=np.float32)
+        with self._lock:
+            if not self.fitted:
+                return scores
+            job_rows, job_known = self._rows('job', job_ids)
+            app_rows, app_known = self._rows('application', application_ids)
+            if not len(job_rows) or not len(app_rows):
+                return scores
+            # TF-IDF rows are L2-normalized, so the dot product is the cosine
+            product = self._matrix['job'][job_rows] @ self._matrix['application'][app_rows].T
+        scores[np.ix_(job_known, app_known)] = product.toarray()
+        return scores
+
+    def score_pairs(self, job_ids, application_ids):
+        # Row-wise similarity of job_ids[i] and application_ids[i], NaN where unknown
+        scores = np.full(len(job_ids), np.nan, dtype=np.float32)
+        with self._lock:
+            if not self.fitted:
+                return scores
+            job_rows = [self._row_of['job'].get(i) for i in job_ids]
+            app_rows = [self._row_of['application'].get(i) for i in application_ids]
+            known = np.array([j is not None and a is not None for j, a in zip(job_rows, app_rows)], dtype=bool)
+            if not known.any():
+                return scores
+            jobs = self._matrix['job'][[j for j, k in zip(job_rows, known) if k]]
+            apps = self._matrix['application'][[a for a, k in zip(app_rows, known) if k]]
+        scores[known] = np.asarray(jobs.multiply(apps).sum(axis=1)).ravel()
+        return scores
+
+    def score_job(self, job_id, application_ids=None):
+        # One job against the given (default: all known) applications
+        with self._lock:
+            if application_ids is None:
+                application_ids = list(self._row_of['application'])
+        return application_ids, self.score([job_id], application_ids)[0]
+
+    def score_texts(self, text_a, text_b):
+        # Similarity of two arbitrary texts under the fitted vocabulary and IDF
+        with self._lock:
+            if not self.fitted:
+                return None
+            rows = self.vectorizer.transform([text_a, text_b])
+        return float((rows[0] @ rows[1].T).toarray()[0, 0])
+
+    @staticmethod
+    def _marker(conn):
+        # Row counts and max ids: cheap to read, and they change whenever a job
+        # or application is added or deleted (edits are picked up by sync())
+        return (conn.execute('SELECT COUNT(*), MAX(id) FROM jobs').fetchone()
+                + conn.execute('SELECT COUNT(*), MAX(id) FROM applications').fetchone())
+
+    def sync_if_changed(self):
+        # For read paths: only sync when rows were added or removed since the last sync
+        if self.fitted and self._marker(db.get_connection()) == self._synced_marker:
+            return 0
+        return self.sync()
+
+    def sync(self):
+        # Bring the scorer up to date with the jobs and application summaries in the database
+        conn = db.get_connection()
+        marker = self._marker(conn)
+        jobs = dict(conn.execute('SELECT id, description FROM jobs'))
+        applications = dict(conn.execute(
+            'SELECT id, extracted_data FROM applications WHERE extracted_data IS NOT NULL'
+        ))
+        with self._lock:
+            stale_jobs = [i for i in self._texts['job'] if i not in jobs]
+            stale_apps = [i for i in self._texts['application'] if i not in applications]
+            self.remove(stale_jobs, stale_apps)
+            self._synced_marker = marker
+            if not self.fitted:
+                self.fit(jobs, applications)
+                return len(jobs) + len(applications)
+            return self.update(jobs, applications)
+
+# Shared scorer, fitted on first sync()
+lexical_scorer = LexicalScorer()
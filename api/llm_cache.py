@@ -0,0 +1,143 @@
+import hashlib
+import json
+import threading
+import time
+from config import Config
+import db
+import metrics
+
+def make_key(chain, model, prompt, temperature):
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    raw = json.dumps([chain, model, prompt_hash, temperature])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    # Persistent cache of LLM results keyed by chain, model, prompt and temperature.
+    # Entries expire after ttl_seconds; past max_entries the oldest are evicted.
+
+    def __init__(self, model, temperature, db_file=None, ttl_seconds=None, max_entries=None):
+        self.model = model
+        self.temperature = temperature
+        self.db_file = db_file or Config.DATABASE_FILE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.LLM_CACHE_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else Config.LLM_CACHE_MAX_ENTRIES
+        self.hits = {}
+        self.misses = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _count(self, counter, chain):
+        with self._lock:
+            counter[chain] = counter.get(chain, 0) + 1
+
+    def get(self, key):
+        row = db.get_connection(self.db_file).execute(
+            'SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?',
+            (key, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, chain, response):
+        self.set_many([(key, chain, response)])
+
+    def set_many(self, entries, conn=None):
+        # (key, chain, response) entries, written in the caller's transaction if one is given
+        if conn is None:
+            with db.transaction(self.db_file) as conn:
+                return self.set_many(entries, conn)
+        now = time.time()
+        conn.executemany('''
+            INSERT OR REPLACE INTO llm_cache (key, chain, model, response, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(key, chain, self.model, json.dumps(response), now) for key, chain, response in entries])
+        with self._lock:
+            before = self._writes
+            self._writes += len(entries)
+            evict = (before - 1) // 100 != (self._writes - 1) // 100  # first write, then every 100
+        if evict:
+            self._evict(conn)
+
+    def _evict(self, conn):
+        conn.execute('DELETE FROM llm_cache WHERE created_at < ?', (time.time() - self.ttl_seconds,))
+        conn.execute('''
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_entries,))
+
+    def cached_call(self, chain, prompt, call):
+        # Read-through: return the cached result for this prompt or run call() and store it
+        response = self.lookup(chain, prompt)
+        if response is not None:
+            return response
+        response = call()
+        self.store(chain, prompt, response)
+        return response
+
+    def lookup(self, chain, prompt):
+        # Cached result for this prompt or None, counted as a hit or miss
+        response = self.get(make_key(chain, self.model, prompt, self.temperature))
+        self._count(self.hits if response is not None else self.misses, chain)
+        metrics.inc('llm_cache_requests_total', chain=chain, result='hit' if response is not None else 'miss')
+        return response
+
+    def store(self, chain, prompt, response):
+        self.set(make_key(chain, self.model, prompt, self.temperature), chain, response)
+
+    def stats(self):
+        with self._lock:
+            return _stats(self.hits, self.misses)
+
+    def session(self):
+        return CacheSession(self)
+
+def _stats(hits, misses):
+    return {
+        chain: {'hits': hits.get(chain, 0), 'misses': misses.get(chain, 0)}
+        for chain in sorted(set(hits) | set(misses))
+    }
+
+class CacheSession:
+    # One pipeline run's use of the cache. Hits and misses are counted for the
+    # run alone (the cache's own counters cover the whole process), and stored
+    # results are buffered until flush(conn) writes them in the stage's next
+    # batch transaction, instead of one write transaction per LLM result from
+    # every executor thread.
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.hits = {}
+        self.misses = {}
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def lookup(self, chain, prompt):
+        response = self.cache.lookup(chain, prompt)
+        with self._lock:
+            counter = self.hits if response is not None else self.misses
+            counter[chain] = counter.get(chain, 0) + 1
+        return response
+
+    def store(self, chain, prompt, response):
+        key = make_key(chain, self.cache.model, prompt, self.cache.temperature)
+        with self._lock:
+            self._pending.append((key, chain, response))
+
+    def cached_call(self, chain, prompt, call):
+        response = self.lookup(chain, prompt)
+        if response is not None:
+            return response
+        response = call()
+        self.store(chain, prompt, response)
+        return response
+
+    def flush(self, conn=None):
+        # Write everything buffered so far; without conn, in a transaction of its own
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self.cache.set_many(pending, conn)
+
+    def stats(self):
+        with self._lock:
+            return _stats(self.hits, self.misses)
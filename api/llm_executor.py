@@ -0,0 +1,95 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import metrics
+
+def estimate_tokens(text):
+    # Rough count for rate limiting: ~4 characters per token for English text
+    return len(text or '') // 4 + 1
+
+class TokenBucket:
+    # Classic token bucket refilled continuously at per_minute / 60 per second
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+def is_retryable(exc):
+    # 429 and 5xx responses are worth retrying; anything else is a real failure
+    status = getattr(exc, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    if status is not None:
+        return status == 429 or 500 <= status < 600
+    name = type(exc).__name__
+    return any(marker in name for marker in ('RateLimit', 'Timeout', 'APIConnection', 'InternalServer'))
+
+class LLMExecutor:
+    # Shared thread pool for pipeline work plus rate limiting for LLM calls.
+    # Tasks run through map() concurrently and send their provider requests
+    # through call(), which applies the request/token limits and retries.
+    # map() yields results as they complete so callers can write them in batches.
+
+    def __init__(self, max_workers=8, requests_per_minute=None, tokens_per_minute=None,
+                 max_retries=5, base_delay=1.0, max_delay=30.0):
+        self.max_workers = max_workers
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+
+    def call(self, fn, *args, tokens=1, **kwargs):
+        # Run fn under the rate limits, retrying rate-limit and server errors
+        # with full-jitter exponential backoff
+        attempt = 0
+        metrics.inc('llm_prompt_tokens_total', tokens)
+        while True:
+            if self.request_bucket:
+                self.request_bucket.acquire(1)
+            if self.token_bucket:
+                self.token_bucket.acquire(tokens)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = getattr(e, 'retry_after', None)
+                if delay is None:
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                metrics.inc('llm_retries_total')
+                time.sleep(delay)
+                attempt += 1
+
+    def submit(self, fn, *args, **kwargs):
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def map(self, fn, items):
+        # Yields (item, result, error) in completion order
+        futures = {self.submit(fn, item): item for item in items}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
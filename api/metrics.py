@@ -0,0 +1,148 @@
+import bisect
+import random
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+
+# In-process metrics: counters and latency histograms keyed by name and labels,
+# rendered in the Prometheus text format by /api/metrics. Histograms use fixed
+# buckets, so observing is a bisect and an increment, and p50/p95/p99 are
+# interpolated from the buckets. With METRICS_ENABLED off every call returns
+# immediately; METRICS_SAMPLE_RATE < 1 only times that fraction of calls.
+
+# Seconds, from sub-millisecond SQLite commits to multi-second LLM calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_help = {}
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def describe(name, text):
+    _help[name] = text
+
+def inc(name, value=1, **labels):
+    if not Config.METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, seconds, **labels):
+    if not Config.METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    index = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'counts': [0] * (len(BUCKETS) + 1), 'sum': 0.0, 'count': 0}
+        histogram['counts'][index] += 1
+        histogram['sum'] += seconds
+        histogram['count'] += 1
+
+def _sampled():
+    rate = Config.METRICS_SAMPLE_RATE
+    return Config.METRICS_ENABLED and (rate >= 1 or random.random() < rate)
+
+@contextmanager
+def timed(name, **labels):
+    # Observe the block's wall time in histogram `name` (also on error)
+    if not _sampled():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def quantile(counts, q):
+    # Linear interpolation inside the bucket holding the q-th observation
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= rank:
+            low = BUCKETS[i - 1] if i > 0 else 0.0
+            high = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+            return low + (high - low) * (rank - seen) / count
+        seen += count
+    return BUCKETS[-1]
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render():
+    # Prometheus text exposition format 0.0.4
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: {'counts': list(h['counts']), 'sum': h['sum'], 'count': h['count']}
+                      for key, h in _histograms.items()}
+
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        if name in _help:
+            lines.append(f'# HELP {name} {_help[name]}')
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {_number(round(value, 6))}')
+
+    for name in sorted({name for name, _ in histograms}):
+        if name in _help:
+            lines.append(f'# HELP {name} {_help[name]}')
+        lines.append(f'# TYPE {name} histogram')
+        series = sorted((labels, h) for (metric, labels), h in histograms.items() if metric == name)
+        for labels, h in series:
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), h['counts']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(h["sum"])}')
+            lines.append(f'{name}_count{_labels(labels)} {h["count"]}')
+        # Interpolated percentiles as a separate gauge family
+        lines.append(f'# TYPE {name}_quantile gauge')
+        for labels, h in series:
+            for q in QUANTILES:
+                value = quantile(h['counts'], q)
+                if value is not None:
+                    lines.append(f'{name}_quantile{_labels(labels, [("quantile", q)])} {_number(round(value, 6))}')
+    return '\n'.join(lines) + '\n'
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+describe('http_request_seconds', 'Time spent handling API requests')
+describe('pipeline_stage_seconds', 'Wall time of background pipeline stages')
+describe('pipeline_tasks_total', 'Finished pipeline tasks by stage and status')
+describe('llm_call_seconds', 'Latency of LLM chain calls, including rate limiting and retries')
+describe('llm_calls_total', 'LLM chain calls by chain and outcome')
+describe('llm_retries_total', 'LLM calls retried after a retryable error')
+describe('llm_prompt_tokens_total', 'Estimated prompt tokens sent to the LLM')
+describe('llm_input_tokens_total', 'Resume/job text tokens before (original) and after (sent) compaction')
+describe('llm_cache_requests_total', 'LLM response cache lookups by chain and result')
+describe('embedding_encode_seconds', 'Time spent in the embedding model encode call')
+describe('embedding_cache_requests_total', 'Embedding lookups by source (lru, db, encoded)')
+describe('embedding_server_requests_total', 'Encode calls served by the embedding server (remote) or in-process (fallback)')
+describe('pdf_parse_seconds', 'Time to parse one PDF with PyMuPDF')
+describe('pdf_text_cache_requests_total', 'PDF text cache lookups by result')
+describe('db_transaction_seconds', 'SQLite write transaction time, BEGIN IMMEDIATE to COMMIT')
+describe('db_commit_seconds', 'SQLite COMMIT time')
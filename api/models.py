@@ -1,8 +1,13 @@
-import sqlite3
-from config import Config
+import db
+
+def _add_column(c, table, column, declaration):
+    # CREATE TABLE IF NOT EXISTS won't touch existing tables, so add new columns explicitly
+    columns = {row[1] for row in c.execute(f'PRAGMA table_info({table})')}
+    if column not in columns:
+        c.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
 
 def init_db():
-    conn = sqlite3.connect(Config.DATABASE_FILE)
+    conn = db.get_connection()
     c = conn.cursor()
 
     # Create jobs table with embedding column
@@ -15,9 +20,11 @@ def init_db():
             threshold REAL DEFAULT 0.1,
             max_candidates INTEGER DEFAULT 5,
             summary TEXT,
-            embedding TEXT  -- Store JSON-serialized embedding
+            embedding TEXT,  -- Store JSON-serialized embedding
+            description_hash TEXT  -- SHA-256 of description, matched on CSV re-upload
         )
     ''')
+    _add_column(c, 'jobs', 'description_hash', 'TEXT')
 
     # Create applications table with email and embedding fields
     c.execute('''
@@ -33,9 +40,13 @@ def init_db():
             selected BOOLEAN DEFAULT FALSE,
             invitation_sent BOOLEAN DEFAULT FALSE,
             embedding TEXT,  -- Store JSON-serialized embedding
+            match_fingerprint TEXT,  -- Inputs hash of the stored match_score
+            resume_sha256 TEXT,  -- SHA-256 of the resume file, set on apply and by bulk ingestion
             FOREIGN KEY (job_id) REFERENCES jobs(id)
         )
     ''')
+    _add_column(c, 'applications', 'match_fingerprint', 'TEXT')
+    _add_column(c, 'applications', 'resume_sha256', 'TEXT')
 
     # Create selected_candidates table with application_id
     c.execute('''
@@ -50,9 +61,68 @@ def init_db():
         )
     ''')
 
+    # Cache of text embeddings keyed by model and SHA-256 of the text
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            model TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            embedding BLOB NOT NULL,  -- float32 vector
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (model, text_hash)
+        )
+    ''')
+
+    # Cache of LLM responses keyed by chain, model, prompt hash and temperature
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            chain TEXT NOT NULL,
+            model TEXT NOT NULL,
+            response TEXT NOT NULL,  -- JSON-serialized result
+            created_at REAL NOT NULL
+        )
+    ''')
+
+    # Text extracted from resume PDFs, keyed by SHA-256 of the file
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS pdf_text_cache (
+            sha256 TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Background pipeline tasks and their progress
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS pipeline_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stage TEXT NOT NULL,
+            params TEXT DEFAULT '{}',
+            status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, completed, failed
+            total INTEGER DEFAULT 0,
+            processed INTEGER DEFAULT 0,
+            error_count INTEGER DEFAULT 0,
+            errors TEXT DEFAULT '[]',  -- Most recent per-item errors
+            result TEXT,
+            owner TEXT,  -- host:pid:boot id of the worker running it
+            attempts INTEGER DEFAULT 0,
+            created_at REAL,
+            started_at REAL,
+            updated_at REAL,
+            finished_at REAL
+        )
+    ''')
+
     # Create indexes for performance
     c.execute('CREATE INDEX IF NOT EXISTS idx_applications_job_id ON applications(job_id)')
+    # Keyset pagination of /api/applications, unfiltered and per filter
+    c.execute('CREATE INDEX IF NOT EXISTS idx_applications_applied_at ON applications(applied_at, id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_applications_job_applied_at ON applications(job_id, applied_at, id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_applications_selected_applied_at ON applications(selected, applied_at, id)')
+    # Bulk ingestion skips resumes already filed for a job
+    c.execute('CREATE INDEX IF NOT EXISTS idx_applications_resume_sha256 ON applications(resume_sha256, job_id)')
     c.execute('CREATE INDEX IF NOT EXISTS idx_selected_candidates_job_id ON selected_candidates(job_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_created_at ON llm_cache(created_at)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_pipeline_tasks_status ON pipeline_tasks(status)')
 
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    conn.commit()
\ No newline at end of file
@@ -0,0 +1,51 @@
+import base64
+import json
+from config import Config
+
+# Keyset pagination helpers for list endpoints. A cursor is the sort key of
+# the last row on the previous page, so each page is an index range scan
+# instead of an OFFSET that re-reads every earlier row.
+
+class PaginationError(ValueError):
+    pass
+
+def encode_cursor(key):
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, size):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+    if not isinstance(key, list) or len(key) != size:
+        raise PaginationError('Invalid cursor')
+    # Sort keys are text, numbers or NULL; anything else can't be bound as a query parameter
+    if not all(value is None or isinstance(value, (str, int, float)) for value in key):
+        raise PaginationError('Invalid cursor')
+    return key
+
+def parse_limit(value):
+    if value is None or value == '':
+        return Config.API_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+    return min(limit, Config.API_MAX_PAGE_SIZE)
+
+def parse_fields(value, columns):
+    # fields=a,b projects the response onto those keys (always keeping the
+    # cursor key columns internally); no value means every column
+    if not value:
+        return list(columns)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in columns]
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields))
@@ -0,0 +1,104 @@
+import hashlib
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+import db
+import metrics
+
+# Resume text extraction. Text is cached by the SHA-256 of the PDF bytes in
+# pdf_text_cache, so the same file uploaded for several jobs is parsed once;
+# cache misses are parsed in a process pool so extraction scales with cores.
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def parse_pdf(path):
+    from langchain.document_loaders import PyMuPDFLoader
+    loader = PyMuPDFLoader(path)
+    docs = loader.load()
+    # One document per page; the form feed between them lets compaction find page headers and footers
+    return "\f".join([doc.page_content for doc in docs])
+
+def _safe_parse(path):
+    # Runs in a worker process; a corrupt PDF shouldn't take the whole batch
+    # down. Returns (text or None, parse seconds) so the parent can record timings.
+    start = time.perf_counter()
+    try:
+        return parse_pdf(path), time.perf_counter() - start
+    except Exception as e:
+        print(f"Error parsing {path}: {e}")
+        return None, time.perf_counter() - start
+
+def _pool_context():
+    # Workers must not be forked from this process: it runs Flask request
+    # threads, task workers, the LLM executor and the prewarm thread, and a
+    # child forked while one of them holds a lock can deadlock. The forkserver
+    # is a clean single-threaded process that only preloads this module.
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=Config.PDF_WORKERS, mp_context=_pool_context())
+        return _pool
+
+def extract_texts(paths):
+    # Returns {path: text} for every path that could be read and parsed
+    hashes = {}
+    for path in set(paths):
+        try:
+            hashes[path] = file_sha256(path)
+        except OSError:
+            continue
+
+    texts_by_hash = {}
+    conn = db.get_connection()
+    distinct = list(set(hashes.values()))
+    for start in range(0, len(distinct), 500):
+        chunk = distinct[start:start + 500]
+        rows = conn.execute(f'''
+            SELECT sha256, text FROM pdf_text_cache
+            WHERE sha256 IN ({','.join('?' * len(chunk))})
+        ''', chunk).fetchall()
+        texts_by_hash.update(rows)
+
+    # Parse each missing file once, in parallel when there are several
+    to_parse = {}
+    for path, sha256 in hashes.items():
+        if sha256 not in texts_by_hash:
+            to_parse.setdefault(sha256, path)
+    metrics.inc('pdf_text_cache_requests_total', len(distinct) - len(to_parse), result='hit')
+    metrics.inc('pdf_text_cache_requests_total', len(to_parse), result='miss')
+    if to_parse:
+        parse_paths = list(to_parse.values())
+        if len(parse_paths) > 1 and Config.PDF_WORKERS > 1:
+            chunksize = max(1, len(parse_paths) // (Config.PDF_WORKERS * 4))
+            results = _get_pool().map(_safe_parse, parse_paths, chunksize=chunksize)
+        else:
+            results = map(_safe_parse, parse_paths)
+        parsed = []
+        for sha256, (text, seconds) in zip(to_parse, results):
+            metrics.observe('pdf_parse_seconds', seconds)
+            if text is not None:
+                parsed.append((sha256, text))
+        with db.transaction() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO pdf_text_cache (sha256, text) VALUES (?, ?)', parsed
+            )
+        texts_by_hash.update(parsed)
+
+    return {path: texts_by_hash[sha256] for path, sha256 in hashes.items() if sha256 in texts_by_hash}
@@ -0,0 +1,479 @@
+import os
+import json
+import threading
+import numpy as np
+from config import Config
+import db
+import metrics
+from utils import match_fingerprint
+from ranking import parse_embeddings, serialize_embedding, normalize_threshold, rank_candidates
+from embeddings import EmbeddingCache
+from embedding_server import EmbeddingClient
+import ai_agent
+from ai_agent import LLM_MODEL, LLM_TEMPERATURE, MATCH_PROMPT_VERSION, llm_executor
+from llm_executor import estimate_tokens
+from llm_cache import LLMCache
+from registry import registry
+import pdf_extract
+from compaction import compact
+import hybrid
+from lexical import lexical_scorer
+
+# Initialize the embedding model (using a lightweight transformer model).
+# Encoding goes to the shared embedding server (embedding_server.py) when
+# one is running, so the workers don't each hold a copy of the model; the
+# in-process model is the fallback. Without a server at startup, the prewarm
+# thread loads the local model as before.
+EMBEDDING_MODEL_NAME = Config.EMBEDDING_MODEL_NAME
+
+def _embedding_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+def _embedding_client():
+    client = EmbeddingClient(Config.EMBEDDING_SERVER_SOCKET, lambda: registry.get('local_embedding_model'),
+                             EMBEDDING_MODEL_NAME)
+    if not client.ping():
+        registry.get('local_embedding_model')
+    return client
+
+registry.register('local_embedding_model', _embedding_model, prewarm=False)
+registry.register('embedding_model', _embedding_client)
+embedding_cache = EmbeddingCache(lambda: registry.get('embedding_model'), EMBEDDING_MODEL_NAME)
+
+# Persistent cache of LLM results so re-runs don't repeat provider calls
+llm_cache = LLMCache(LLM_MODEL, LLM_TEMPERATURE)
+
+# Pipeline stages. Each stage only selects work that is still outstanding
+# (no summary yet, stale match fingerprint, ...) and commits every
+# PIPELINE_BATCH_SIZE results, so re-running an interrupted stage resumes
+# from its last committed batch. Progress is reported through a
+# set_total()/advance() object, see task_queue.TaskProgress. Stages read on
+# the thread's pooled connection and keep write transactions short: slow work
+# (LLM calls, embedding) happens before a batch's transaction is opened.
+
+class PipelineError(Exception):
+    pass
+
+class NullProgress:
+    def set_total(self, total):
+        pass
+
+    def advance(self, processed, errors=()):
+        pass
+
+def _token_estimate(prompt):
+    return estimate_tokens(prompt) + Config.LLM_OUTPUT_TOKEN_ESTIMATE
+
+def _llm_call(chain, fn, *args, tokens=1, **kwargs):
+    # llm_executor.call with per-chain latency and outcome metrics
+    outcome = 'error'
+    try:
+        with metrics.timed('llm_call_seconds', chain=chain):
+            result = llm_executor.call(fn, *args, tokens=tokens, **kwargs)
+        outcome = 'ok'
+        return result
+    finally:
+        metrics.inc('llm_calls_total', chain=chain, outcome=outcome)
+
+class TokenStats:
+    # Per-call input compaction stats: counted in llm_input_tokens_total and summed for the stage result
+    def __init__(self, chain):
+        self.chain = chain
+        self.calls = 0
+        self.original = 0
+        self.sent = 0
+        self.truncated = 0
+        self._lock = threading.Lock()
+
+    def compact(self, text, budget):
+        text, stats = compact(text, budget)
+        metrics.inc('llm_input_tokens_total', stats['originalTokens'], chain=self.chain, kind='original')
+        metrics.inc('llm_input_tokens_total', stats['compactedTokens'], chain=self.chain, kind='sent')
+        with self._lock:
+            self.calls += 1
+            self.original += stats['originalTokens']
+            self.sent += stats['compactedTokens']
+            self.truncated += stats['truncated']
+        return text
+
+    def summary(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'originalTokens': self.original,
+                'sentTokens': self.sent,
+                'truncated': self.truncated
+            }
+
+def _run_batched(progress, fn, items, store, grouped=False):
+    # Run fn over items on the shared executor and hand results to store()
+    # in batches, reporting progress after each one is committed. With
+    # grouped=True each item is a list of work items and fn returns one
+    # (work item, result, error) per entry.
+    errors = []
+    batch = []
+    batch_errors = []
+    done = 0
+
+    def flush():
+        if batch:
+            store(batch)
+        progress.advance(len(batch) + len(batch_errors), batch_errors)
+
+    for item, result, error in llm_executor.map(fn, items):
+        if not grouped:
+            outcomes = [(item, result, error)]
+        elif error is not None:
+            outcomes = [(entry, None, error) for entry in item]
+        else:
+            outcomes = result
+        for entry, entry_result, entry_error in outcomes:
+            if entry_error is not None:
+                batch_errors.append({'id': entry[0], 'error': str(entry_error)})
+            else:
+                batch.append((entry, entry_result))
+                done += 1
+        if len(batch) + len(batch_errors) >= Config.PIPELINE_BATCH_SIZE:
+            flush()
+            errors.extend(batch_errors)
+            batch, batch_errors = [], []
+
+    flush()
+    errors.extend(batch_errors)
+    return done, errors
+
+def extract_pdf_data(progress=None):
+    progress = progress or NullProgress()
+    c = db.get_connection().cursor()
+    c.execute('''
+        SELECT a.id, a.resume_text
+        FROM applications a
+        JOIN jobs j ON a.job_id = j.id
+        WHERE a.extracted_data IS NULL
+    ''')
+    resume_paths = {
+        app_id: os.path.join(Config.RESUMES_FOLDER, resume_filename)
+        for app_id, resume_filename in c.fetchall()
+    }
+    # Parse every resume up front (in parallel, reusing cached text)
+    texts = pdf_extract.extract_texts(list(resume_paths.values()))
+    applications = [(app_id, texts[path]) for app_id, path in resume_paths.items() if path in texts]
+    progress.set_total(len(applications))
+
+    token_stats = TokenStats('summarize_resume')
+    cache = llm_cache.session()
+
+    def summarize(app):
+        # Clean and fit the raw PDF text to the resume token budget first
+        resume_text = token_stats.compact(app[1], Config.RESUME_TOKEN_BUDGET)
+        # Run resume summarization chain
+        prompt = ai_agent.summarize_resume_prompt.format(resume=resume_text)
+        return cache.cached_call('summarize_resume', prompt, lambda: _llm_call(
+            'summarize_resume', ai_agent.summarize_resume_chain.run, resume=resume_text, tokens=_token_estimate(prompt)
+        ))
+
+    def store(batch):
+        # Generate embeddings for the batch's resume summaries in one call
+        resume_embeddings = embedding_cache.encode([summary for _, summary in batch])
+        # Store embeddings as JSON strings (or compact blobs, see EMBEDDING_STORAGE)
+        with db.transaction() as conn:
+            cache.flush(conn)
+            conn.executemany('''
+                UPDATE applications
+                SET extracted_data = ?, embedding = ?
+                WHERE id = ?
+            ''', [
+                (summary, serialize_embedding(embedding), app[0])
+                for (app, summary), embedding in zip(batch, resume_embeddings)
+            ])
+
+    extracted, errors = _run_batched(progress, summarize, applications, store)
+    cache.flush()
+    # New summaries are folded into the lexical scorer here, not on the shortlist read path
+    if extracted:
+        lexical_scorer.sync()
+    return {
+        'message': 'PDF data extracted successfully',
+        'extracted': extracted,
+        'errors': errors,
+        'tokens': token_stats.summary(),
+        'llm_cache': cache.stats()
+    }
+
+def summarize_jobs(progress=None):
+    progress = progress or NullProgress()
+    c = db.get_connection().cursor()
+    c.execute('SELECT id, description FROM jobs WHERE summary IS NULL')
+    jobs = c.fetchall()
+    progress.set_total(len(jobs))
+
+    token_stats = TokenStats('summarize_job')
+    cache = llm_cache.session()
+
+    def summarize(job):
+        description = token_stats.compact(job[1], Config.JOB_TOKEN_BUDGET)
+        prompt = ai_agent.summarize_prompt.format(job_description=description)
+        return cache.cached_call('summarize_job', prompt, lambda: _llm_call(
+            'summarize_job', ai_agent.summarize_chain.run, job_description=description, tokens=_token_estimate(prompt)
+        )).strip()
+
+    def store(batch):
+        # Generate embeddings for the batch's job summaries in one call
+        job_embeddings = embedding_cache.encode([summary for _, summary in batch])
+        # Store embeddings as JSON strings (or compact blobs, see EMBEDDING_STORAGE)
+        with db.transaction() as conn:
+            cache.flush(conn)
+            conn.executemany('UPDATE jobs SET summary = ?, embedding = ? WHERE id = ?', [
+                (summary, serialize_embedding(embedding), job[0])
+                for (job, summary), embedding in zip(batch, job_embeddings)
+            ])
+
+    summarized, errors = _run_batched(progress, summarize, jobs, store)
+    cache.flush()
+    return {
+        'message': 'Jobs summarized successfully',
+        'summarized': summarized,
+        'errors': errors,
+        'tokens': token_stats.summary(),
+        'llm_cache': cache.stats()
+    }
+
+def pending_matches(force=False, top_n=0):
+    # Only pairs whose resume summary, job description or prompt changed need
+    # scoring. With top_n, only each job's hybrid (lexical + semantic)
+    # shortlist is sent to the LLM; returns (pending, total, prefiltered).
+    c = db.get_connection().cursor()
+    c.execute('''
+        SELECT a.id, a.extracted_data, j.description, a.match_fingerprint
+        FROM applications a
+        JOIN jobs j ON a.job_id = j.id
+        WHERE a.extracted_data IS NOT NULL
+    ''')
+    applications = c.fetchall()
+
+    pending = []
+    for app_id, extracted_data, job_description, stored_fingerprint in applications:
+        fingerprint = match_fingerprint(extracted_data, job_description, MATCH_PROMPT_VERSION)
+        if force or fingerprint != stored_fingerprint:
+            pending.append((app_id, extracted_data, job_description, fingerprint))
+
+    prefiltered = 0
+    if top_n and pending:
+        shortlisted = {
+            app_id for candidates in hybrid.shortlist(top_n, sync=True).values()
+            for app_id, _, _, _ in candidates
+        }
+        prefiltered = sum(1 for pair in pending if pair[0] not in shortlisted)
+        pending = [pair for pair in pending if pair[0] in shortlisted]
+    return pending, len(applications), prefiltered
+
+MATCH_SCORE_FIELDS = ('experience_score', 'skills_score', 'education_score', 'other_score')
+
+def _pack_match_batches(pending, batch_size, token_budget):
+    # Group pending pairs by job and pack each job's resumes into requests of
+    # at most batch_size candidates and roughly token_budget prompt + output tokens
+    by_job = {}
+    for pair in pending:
+        by_job.setdefault(pair[2], []).append(pair)
+
+    batches = []
+    per_candidate_output = Config.LLM_MATCH_OUTPUT_TOKENS_PER_CANDIDATE
+    for job_description, pairs in by_job.items():
+        base = estimate_tokens(ai_agent.BATCH_MATCH_TEMPLATE) + estimate_tokens(job_description)
+        batch, tokens = [], base
+        for pair in pairs:
+            cost = estimate_tokens(pair[1]) + per_candidate_output
+            if batch and (len(batch) >= batch_size or tokens + cost > token_budget):
+                batches.append(batch)
+                batch, tokens = [], base
+            batch.append(pair)
+            tokens += cost
+        batches.append(batch)
+    return batches
+
+def _parse_batch_scores(response, candidate_ids):
+    # {candidate_id: MatchScores} for every well-formed entry of a batched response
+    parsed = {}
+    entries = response.get('scores') if isinstance(response, dict) else None
+    for entry in entries or []:
+        if not isinstance(entry, dict) or str(entry.get('candidate_id')) not in candidate_ids:
+            continue
+        try:
+            parsed[str(entry['candidate_id'])] = {field: int(entry[field]) for field in MATCH_SCORE_FIELDS}
+        except (KeyError, TypeError, ValueError):
+            continue
+    return parsed
+
+def compute_matches(progress=None, force=False, top_n=None, batch_size=None):
+    progress = progress or NullProgress()
+    top_n = Config.HYBRID_TOP_N if top_n is None else top_n
+    batch_size = Config.LLM_MATCH_BATCH_SIZE if batch_size is None else batch_size
+    pending, total, prefiltered = pending_matches(force, top_n)
+    progress.set_total(len(pending))
+
+    # Each job description is compacted once and shared by all its prompts
+    token_stats = TokenStats('match_score')
+    cache = llm_cache.session()
+    descriptions = {
+        description: token_stats.compact(description, Config.JOB_TOKEN_BUDGET)
+        for description in {pair[2] for pair in pending}
+    }
+    pending = [(app_id, summary, descriptions[description], fingerprint)
+               for app_id, summary, description, fingerprint in pending]
+    requests = {'single': 0, 'batched': 0}
+    requests_lock = threading.Lock()
+
+    def count_request(kind):
+        with requests_lock:
+            requests[kind] += 1
+
+    def single_prompt(pair):
+        app_id, extracted_data, job_description, fingerprint = pair
+        return ai_agent.match_prompt.format(job_description=job_description, resume_text=extracted_data)
+
+    def score_single(prompt):
+        # Run structured LLM with prompt
+        count_request('single')
+        return _llm_call(
+            'match_score', ai_agent.match_score_structured_llm.invoke, prompt, tokens=_token_estimate(prompt)
+        )
+
+    def score_batch(pairs):
+        # One request for several resumes of the same job; {app_id: scores} for
+        # whatever came back well-formed, empty if the request itself failed
+        prompt = ai_agent.batch_match_prompt.format(
+            job_description=pairs[0][2],
+            candidates=ai_agent.format_candidates([(pair[0], pair[1]) for pair in pairs])
+        )
+        tokens = estimate_tokens(prompt) + Config.LLM_MATCH_OUTPUT_TOKENS_PER_CANDIDATE * len(pairs)
+        count_request('batched')
+        try:
+            response = _llm_call('batch_match_score', ai_agent.batch_match_structured_llm.invoke, prompt, tokens=tokens)
+        except Exception as e:
+            print(f"Batched match scoring failed, scoring {len(pairs)} candidates singly: {e}")
+            return {}
+        parsed = _parse_batch_scores(response, {str(pair[0]) for pair in pairs})
+        return {pair[0]: parsed[str(pair[0])] for pair in pairs if str(pair[0]) in parsed}
+
+    def score(group):
+        # Cached pairs are answered from the cache, the rest go out as one batched
+        # request; anything it didn't return falls back to the single-resume prompt.
+        # Results are cached per pair under the single prompt either way; with
+        # force every pair is re-scored by the LLM and the cache is refreshed.
+        prompts = {pair[0]: single_prompt(pair) for pair in group}
+        scores = {}
+        for pair in group:
+            cached = None if force else cache.lookup('match_score', prompts[pair[0]])
+            if cached is not None:
+                scores[pair[0]] = cached
+        uncached = [pair for pair in group if pair[0] not in scores]
+        if len(uncached) > 1:
+            for app_id, match_score in score_batch(uncached).items():
+                cache.store('match_score', prompts[app_id], match_score)
+                scores[app_id] = match_score
+
+        outcomes = []
+        for pair in group:
+            if pair[0] not in scores:
+                try:
+                    scores[pair[0]] = score_single(prompts[pair[0]])
+                    cache.store('match_score', prompts[pair[0]], scores[pair[0]])
+                except Exception as e:
+                    outcomes.append((pair, None, e))
+                    continue
+            outcomes.append((pair, scores[pair[0]], None))
+        return outcomes
+
+    def store(batch):
+        with db.transaction() as conn:
+            cache.flush(conn)
+            conn.executemany('''
+                UPDATE applications
+                SET match_score = ?, match_fingerprint = ?
+                WHERE id = ?
+            ''', [(json.dumps(match_score), pair[3], pair[0]) for pair, match_score in batch])
+
+    batches = _pack_match_batches(pending, max(1, batch_size), Config.LLM_MATCH_BATCH_TOKENS)
+    scored, errors = _run_batched(progress, score, batches, store, grouped=True)
+    cache.flush()
+    return {
+        'message': 'Match scores computed successfully',
+        'scored': scored,
+        'llm_requests': requests,
+        'tokens': token_stats.summary(),
+        'unchanged': total - len(pending) - prefiltered,
+        'prefiltered': prefiltered,
+        'errors': errors,
+        'llm_cache': cache.stats()
+    }
+
+def select_candidates(progress=None):
+    progress = progress or NullProgress()
+    c = db.get_connection().cursor()
+
+    # Query all job IDs and embeddings from jobs table
+    c.execute('SELECT id, summary, embedding, threshold, max_candidates FROM jobs')
+    jobs = c.fetchall()
+
+    if not jobs:
+        raise PipelineError("No jobs found in the jobs table")
+
+    # Skip jobs without summaries or embeddings, then load the rest as one matrix
+    jobs = [job for job in jobs if job[1] and job[2]]
+    job_matrix, valid_jobs = parse_embeddings([job[2] for job in jobs])
+    jobs = [jobs[i] for i in valid_jobs]
+    job_row = {job[0]: i for i, job in enumerate(jobs)}
+    thresholds = np.array([normalize_threshold(job[3]) for job in jobs], dtype=np.float32)
+    max_candidates = np.array([job[4] if job[4] is not None else 5 for job in jobs], dtype=np.int64)
+
+    # Load every application embedding for those jobs in one pass
+    c.execute('SELECT id, job_id, embedding FROM applications WHERE embedding IS NOT NULL')
+    applications = [app for app in c.fetchall() if app[1] in job_row]
+    app_matrix, valid_apps = parse_embeddings([app[2] for app in applications])
+    applications = [applications[i] for i in valid_apps]
+    progress.set_total(len(applications))
+
+    # Rank candidates per job, honoring each job's threshold and max_candidates
+    selected_candidates = []
+    if applications and app_matrix.shape[1] == job_matrix.shape[1]:
+        app_job_rows = np.array([job_row[app[1]] for app in applications], dtype=np.int64)
+        selected, similarities = rank_candidates(
+            job_matrix, app_matrix, app_job_rows, thresholds, max_candidates
+        )
+        selected_candidates = [
+            (applications[i][0], applications[i][1], json.dumps({'similarity': float(similarity)}))
+            for i, similarity in zip(selected, similarities)
+        ]
+
+    with db.transaction() as conn:
+        # Clear existing selected candidates
+        conn.execute('DELETE FROM selected_candidates')
+
+        # Reset selection status in applications
+        conn.execute('UPDATE applications SET selected = FALSE')
+
+        # Update database for selected candidates
+        conn.executemany('''
+            UPDATE applications
+            SET selected = TRUE
+            WHERE id = ?
+        ''', [(app_id,) for app_id, _, _ in selected_candidates])
+        conn.executemany('''
+            INSERT INTO selected_candidates (application_id, job_id, match_score)
+            VALUES (?, ?, ?)
+        ''', selected_candidates)
+
+    progress.advance(len(applications))
+    return {
+        'message': 'Candidates filtered and selected successfully for all jobs',
+        'selected': len(selected_candidates)
+    }
+
+# Stage name -> callable, as enqueued through the task queue
+STAGES = {
+    'extract-pdf-data': extract_pdf_data,
+    'summarize-job': summarize_jobs,
+    'compute-matches': compute_matches,
+    'select-candidates': select_candidates
+}
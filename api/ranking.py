@@ -0,0 +1,150 @@
+import json
+import numpy as np
+from config import Config
+
+# Compact embedding blobs: a one-byte tag, then the vector. int8 stores a
+# float32 scale (max |x| / 127) before the codes. Cosine scores only need the
+# direction, so both lose little: 384 dims take 389 (int8) or 769 (float16)
+# bytes instead of ~8 KB of JSON text.
+FLOAT16_TAG = b'h'
+INT8_TAG = b'q'
+
+def serialize_embedding(vector, storage=None):
+    storage = storage or Config.EMBEDDING_STORAGE
+    vector = np.asarray(vector, dtype=np.float32)
+    if storage == 'float16':
+        return FLOAT16_TAG + vector.astype(np.float16).tobytes()
+    if storage == 'int8':
+        scale = np.float32(np.abs(vector).max() / 127 if vector.size and np.abs(vector).max() > 0 else 1)
+        codes = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        return INT8_TAG + scale.tobytes() + codes.tobytes()
+    return json.dumps(vector.tolist())
+
+def _decode_blobs(values):
+    # All values share one tag and length; decode them as a single buffer
+    tag = values[0][:1]
+    data = np.frombuffer(b''.join(value[1:] for value in values), dtype=np.uint8).reshape(len(values), -1)
+    if tag == FLOAT16_TAG:
+        return data.view(np.float16).astype(np.float32)
+    if tag == INT8_TAG:
+        scales = data[:, :4].copy().view(np.float32)
+        return data[:, 4:].view(np.int8).astype(np.float32) * scales
+    raise ValueError(f'Unknown embedding format: {tag!r}')
+
+def _decode_embedding(value):
+    if isinstance(value, bytes):
+        return _decode_blobs([value])[0]
+    return np.array(json.loads(value), dtype=np.float32)
+
+def parse_embeddings(values):
+    # Decode JSON-serialized (or compact blob) embeddings into a row-normalized
+    # float32 matrix. Returns the matrix and the positions in `values` that
+    # decoded cleanly.
+    if not values:
+        return np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=np.int64)
+    try:
+        if isinstance(values[0], bytes):
+            # Fast path for blobs: one frombuffer when every row has the same format
+            if len({(value[:1], len(value)) if isinstance(value, bytes) else None for value in values}) != 1:
+                raise ValueError('Mixed embedding formats')
+            matrix = _decode_blobs(values)
+        else:
+            # Fast path: one json.loads over all rows instead of one per row
+            matrix = np.array(json.loads('[' + ','.join(values) + ']'), dtype=np.float32)
+        valid = np.arange(len(values))
+        if matrix.ndim != 2:
+            raise ValueError('Ragged embeddings')
+    except (ValueError, TypeError):
+        rows, valid = [], []
+        for i, value in enumerate(values):
+            try:
+                row = _decode_embedding(value)
+            except (ValueError, TypeError):
+                continue  # Skip invalid embeddings
+            if row.ndim == 1:
+                rows.append(row)
+                valid.append(i)
+        dims = {row.shape for row in rows}
+        if len(dims) > 1:
+            # Keep the majority dimension, anything else is a stale model's output
+            shape = max(dims, key=lambda d: sum(row.shape == d for row in rows))
+            valid = [i for i, row in zip(valid, rows) if row.shape == shape]
+            rows = [row for row in rows if row.shape == shape]
+        matrix = np.array(rows, dtype=np.float32) if rows else np.empty((0, 0), dtype=np.float32)
+        valid = np.array(valid, dtype=np.int64)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1), valid
+
+def normalize_threshold(threshold):
+    # Thresholds come from the CSV as percentages (e.g. 10) or as fractions (0.1)
+    if threshold is None:
+        return 0.0
+    threshold = float(threshold)
+    return threshold / 100 if threshold > 1 else threshold
+
+def rank_candidates(job_matrix, app_matrix, app_job_rows, thresholds, max_candidates):
+    # Score every application against the job it applied to and pick the best
+    # per job, all in NumPy.
+    #   job_matrix:     (J, dim) normalized job embeddings
+    #   app_matrix:     (A, dim) normalized application embeddings
+    #   app_job_rows:   (A,) row in job_matrix for each application
+    #   thresholds:     (J,) minimum similarity per job
+    #   max_candidates: (J,) number of candidates to keep per job
+    # Returns (application rows, similarities) of the selected candidates.
+    if len(app_matrix) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    # Each application only competes within its own job, so the job x application
+    # block reduces to one dot product per application
+    similarities = np.einsum('ij,ij->i', app_matrix, job_matrix[app_job_rows])
+
+    # Rank within each job and keep the best that clear the job's threshold
+    rank = group_ranks(similarities, app_job_rows)
+    keep = (rank < max_candidates[app_job_rows]) & (similarities >= thresholds[app_job_rows])
+    selected = np.flatnonzero(keep)
+    selected = selected[np.lexsort((rank[selected], app_job_rows[selected]))]
+    return selected, similarities[selected]
+
+def group_ranks(scores, groups):
+    # 0-based rank of each score within its group, highest first (NaN last)
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    order = np.lexsort((-scores, groups))
+    sorted_groups = groups[order]
+    group_start = np.r_[0, np.flatnonzero(np.diff(sorted_groups)) + 1]
+    group_sizes = np.diff(np.r_[group_start, len(order)])
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - np.repeat(group_start, group_sizes)
+    return rank
+
+def fuse_scores(signals, groups, method='rrf', weights=None, rrf_k=60):
+    # Combine several (A,) score arrays (e.g. lexical and semantic) into one.
+    #   rrf:      sum of weight / (rrf_k + rank) with ranks taken within each group
+    #   weighted: sum of weight * score, each signal min-max scaled within its group
+    # NaN marks a missing score: last place for rrf, 0 for weighted.
+    weights = weights if weights is not None else [1.0] * len(signals)
+    fused = np.zeros(len(groups), dtype=np.float64)
+    if not len(groups):
+        return fused
+    for signal, weight in zip(signals, weights):
+        signal = np.asarray(signal, dtype=np.float64)
+        if method == 'rrf':
+            fused += weight / (rrf_k + group_ranks(signal, groups) + 1)
+        elif method == 'weighted':
+            present = ~np.isnan(signal)
+            size = groups.max() + 1
+            low = np.full(size, np.inf)
+            high = np.full(size, -np.inf)
+            np.minimum.at(low, groups[present], signal[present])
+            np.maximum.at(high, groups[present], signal[present])
+            span = (high - low)[groups]
+            scaled = np.where(span > 0, (signal - low[groups]) / np.where(span > 0, span, 1), 1.0)
+            fused += weight * np.where(present, scaled, 0.0)
+        else:
+            raise ValueError(f'Unknown fusion method: {method}')
+    return fused
+
+def top_per_group(scores, groups, top_n):
+    # Positions of the top_n highest scores in each group
+    rank = group_ranks(scores, groups)
+    return np.flatnonzero(rank < top_n)
@@ -0,0 +1,69 @@
+import threading
+import time
+
+# Lazily constructed models and LLM clients. Factories are registered at
+# import time but only run on first get(), so importing the app (and serving
+# the plain CRUD endpoints) never waits on langchain, torch or model weights.
+# prewarm() loads everything in a background thread right after startup.
+
+class LazyRegistry:
+    def __init__(self):
+        self._factories = {}
+        self._prewarmed = []
+        self._instances = {}
+        self._load_seconds = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory, prewarm=True):
+        # prewarm=False: only loaded on demand (e.g. a fallback that is usually not needed)
+        with self._lock:
+            self._factories[name] = factory
+            self._locks[name] = threading.RLock()
+            if name in self._prewarmed:
+                self._prewarmed.remove(name)
+            if prewarm:
+                self._prewarmed.append(name)
+
+    def __contains__(self, name):
+        return name in self._factories
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(name)
+        # Per-name lock: concurrent first callers build the object once, and a
+        # factory may get() its own dependencies (the chains need the llm)
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                self._load_seconds[name] = time.perf_counter() - start
+                self._instances[name] = instance
+        return instance
+
+    def prewarm(self, names=None):
+        def load():
+            for name in names or list(self._prewarmed):
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Error prewarming {name}: {e}")
+
+        thread = threading.Thread(target=load, name='registry-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        return {
+            name: {
+                'loaded': name in self._instances,
+                'loadSeconds': round(self._load_seconds[name], 3) if name in self._load_seconds else None
+            }
+            for name in self._factories
+        }
+
+registry = LazyRegistry()
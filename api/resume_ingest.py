@@ -0,0 +1,234 @@
+import codecs
+import csv
+import hashlib
+import io
+import os
+import re
+import uuid
+import zipfile
+import zlib
+from datetime import datetime
+from werkzeug.utils import secure_filename
+from config import Config
+import db
+
+# Bulk resume ingestion: a ZIP of PDFs or a CSV of pre-extracted text
+# (Filename, Text, as in custom-vectordb/extracted_text.csv), each entry
+# filed as an application for one or more jobs. Entries are streamed, so
+# neither the archive nor the CSV is held in memory. Files are stored under
+# a content-addressed name, content already on file is not written again,
+# and a resume already filed for a job is skipped. All applications are
+# inserted with one executemany in a single transaction. CSV text is written
+# as a .txt file and seeded into pdf_text_cache, so extract-pdf-data never
+# has to parse it.
+
+EMAIL = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+
+class IngestError(ValueError):
+    pass
+
+def csv_rows(stream):
+    # DictReader rows straight off a binary upload. One pass to pick the
+    # encoding (UTF-8, else cp1252), then the stream is rewound and parsed.
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    encoding = 'utf-8-sig'
+    stream.seek(0)
+    try:
+        for chunk in iter(lambda: stream.read(1 << 20), b''):
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        encoding = 'cp1252'
+    stream.seek(0)
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        text.detach()
+
+def _target(row):
+    # (job id or None, applicant name, email) from a mapping or CSV row; the
+    # job id is validated per file in ResumeIngest._add
+    job_id = (row.get('Job ID') or '').strip()
+    return job_id or None, row.get('Applicant Name') or None, row.get('Email') or None
+
+def parse_mapping(stream):
+    # {filename: [target, ...]} from a CSV with Filename and Job ID columns
+    # (Applicant Name and Email optional); a file may be mapped to several jobs.
+    # A row without a Job ID files the resume under the upload's default job.
+    mapping = {}
+    for row in csv_rows(stream):
+        name = os.path.basename(row['Filename'] or '')
+        if name:
+            mapping.setdefault(name, []).append(_target(row))
+    return mapping
+
+class ResumeIngest:
+    def __init__(self, default_job=None, mapping=None, folder=None):
+        self.default_job = default_job
+        self.mapping = mapping or {}
+        self.folder = folder or Config.RESUMES_FOLDER
+        self.conn = db.get_connection()
+        self.jobs = {row[0] for row in self.conn.execute('SELECT id FROM jobs')}
+        self.applied_at = datetime.now().isoformat()
+        self._applications = []
+        self._texts = []
+        self._filed = set()  # (sha256, job_id) filed by this upload
+        self._stored = {}  # sha256 -> filename stored by this upload
+        self._written = []  # paths created by this upload, removed by discard()
+        self.counts = {'ingested': 0, 'duplicates': 0, 'skipped': 0}
+        self.errors = []
+
+    def _error(self, name, message):
+        self.errors.append({'filename': name, 'error': message})
+
+    def _targets(self, name, row=None):
+        targets = self.mapping.get(name) or [_target(row or {})]
+        return [(self.default_job if job_id is None else job_id, applicant, email)
+                for job_id, applicant, email in targets]
+
+    def _add(self, name, sha256, store, targets, email=None):
+        # store() writes the file and returns its name; only called for new content
+        if not targets:
+            self._error(name, 'No job mapped')
+            return
+        existing = self.conn.execute(
+            'SELECT job_id, resume_text FROM applications WHERE resume_sha256 = ?', (sha256,)
+        ).fetchall()
+        filed_jobs = {job_id for job_id, _ in existing}
+        filename = None
+        for target in targets:
+            job_id, applicant, applicant_email = target or (None, None, None)
+            if job_id is None:
+                self._error(name, 'No job mapped')
+                continue
+            try:
+                job_id = int(job_id)
+            except (TypeError, ValueError):
+                self._error(name, f'Invalid Job ID: {job_id}')
+                continue
+            if job_id not in self.jobs:
+                self._error(name, f'Job {job_id} not found')
+                continue
+            if job_id in filed_jobs or (sha256, job_id) in self._filed:
+                self.counts['duplicates'] += 1
+                continue
+            if filename is None:
+                filename = self._stored.get(sha256) or (existing[0][1] if existing else None) or store()
+                self._stored[sha256] = filename
+            self._filed.add((sha256, job_id))
+            self._applications.append((
+                applicant or os.path.splitext(name)[0],
+                applicant_email or email or '',
+                filename,
+                job_id,
+                self.applied_at,
+                sha256
+            ))
+            self.counts['ingested'] += 1
+
+    def _create(self, filename):
+        # Full path for a new stored file, remembered so a failed upload can remove it
+        path = os.path.join(self.folder, filename)
+        if not os.path.exists(path):
+            self._written.append(path)
+        return path
+
+    def discard(self):
+        # Remove the files this upload stored; called when it is not committed
+        for path in self._written:
+            if os.path.exists(path):
+                os.unlink(path)
+        self._written = []
+
+    def _path(self, name, sha256, extension):
+        # Content-addressed, so equal names from different batches never collide
+        stem = secure_filename(os.path.splitext(name)[0]) or 'resume'
+        return f'{sha256[:12]}_{stem}{extension}'
+
+    def _spool(self, entry):
+        # Copy a ZIP entry to a temp file while hashing it; (temp path, sha256)
+        path = os.path.join(self.folder, f'.ingest-{uuid.uuid4().hex}.tmp')
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(path, 'wb') as out:
+                for chunk in iter(lambda: entry.read(1 << 20), b''):
+                    size += len(chunk)
+                    if size > Config.BULK_MAX_ENTRY_BYTES:
+                        raise IngestError(f'Larger than {Config.BULK_MAX_ENTRY_BYTES} bytes')
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path, digest.hexdigest()
+
+    def add_zip(self, stream):
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or not name or name.startswith('.') or info.filename.startswith('__MACOSX/'):
+                    continue
+                if not name.lower().endswith('.pdf'):
+                    self.counts['skipped'] += 1
+                    continue
+                if info.file_size > Config.BULK_MAX_ENTRY_BYTES:
+                    self._error(name, f'Larger than {Config.BULK_MAX_ENTRY_BYTES} bytes')
+                    continue
+                try:
+                    with archive.open(info) as entry:
+                        temp, sha256 = self._spool(entry)
+                except (IngestError, zipfile.BadZipFile, zlib.error, OSError) as e:
+                    self._error(name, str(e))
+                    continue
+
+                def store(temp=temp, name=name, sha256=sha256):
+                    filename = self._path(name, sha256, '.pdf')
+                    os.replace(temp, self._create(filename))
+                    return filename
+
+                try:
+                    self._add(name, sha256, store, self._targets(name))
+                finally:
+                    if os.path.exists(temp):
+                        os.unlink(temp)
+
+    def add_csv(self, stream):
+        for row in csv_rows(stream):
+            name = os.path.basename(row['Filename'] or '')
+            text = row['Text'] or ''
+            if not name or not text.strip():
+                self.counts['skipped'] += 1
+                continue
+            data = text.encode('utf-8')
+            sha256 = hashlib.sha256(data).hexdigest()
+
+            def store(data=data, text=text, name=name, sha256=sha256):
+                filename = self._path(name, sha256, '.txt')
+                with open(self._create(filename), 'wb') as f:
+                    f.write(data)
+                self._texts.append((sha256, text))
+                return filename
+
+            email = EMAIL.search(text)
+            self._add(name, sha256, store, self._targets(name, row), email.group(0) if email else None)
+
+    def commit(self):
+        try:
+            self._insert()
+        except BaseException:
+            self.discard()
+            raise
+        self._written = []
+        return {**self.counts, 'errors': self.errors}
+
+    def _insert(self):
+        with db.transaction() as conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO pdf_text_cache (sha256, text) VALUES (?, ?)', self._texts
+            )
+            conn.executemany('''
+                INSERT INTO applications (username, email, resume_text, job_id, applied_at, resume_sha256)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', self._applications)
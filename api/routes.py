@@ -1,26 +1,101 @@
-from flask import request, jsonify
-import sqlite3
+from flask import request, jsonify, g
+import db
+import metrics
+import time
 from datetime import datetime
 import csv
 import io
 from werkzeug.utils import secure_filename
 import os
-from langchain.document_loaders import PyMuPDFLoader
 from config import Config
-from utils import compute_match_score, job_summurizer
-from ai_agent import summarize_chain, match_chain, summarize_resume_chain
-from ai_agent import match_score_structured_llm, match_prompt
-from ai_agent import filter_prompt_structured_llm, filter_prompt
-import json
-import re
-from sentence_transformers import SentenceTransformer
-import numpy as np
-
-# Initialize the embedding model (using a lightweight transformer model)
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+import pipeline
+import hybrid
+import pdf_extract
+from pagination import PaginationError, encode_cursor, decode_cursor, parse_limit, parse_fields
+from task_queue import TaskQueue
+from job_store import parse_job_row, upsert_jobs
+from resume_ingest import ResumeIngest, parse_mapping
+import zipfile
+
+# Pipeline stages run as background tasks
+task_queue = TaskQueue(pipeline.STAGES)
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+# Response key -> SQL column for the paginated list endpoints
+JOB_COLUMNS = {
+    'id': 'id',
+    'Job Title': 'title',
+    'Job Description': 'description',
+    'threshold': 'threshold',
+    'maxCandidatest': 'max_candidates',
+    'summary': 'summary'
+}
+
+APPLICATION_COLUMNS = {
+    'id': 'a.id',
+    'applicantName': 'a.username',
+    'resumeFile': 'a.resume_text',
+    'jobTitle': 'j.title',
+    'appliedAt': 'a.applied_at',
+    'jobId': 'a.job_id',
+    'extractedData': 'a.extracted_data',
+    'matchScore': 'a.match_score',
+    'selected': 'a.selected',
+    'invitationSent': 'a.invitation_sent'
+}
+
+def _page(c, sql, params, fields, key_size, limit):
+    # Runs a keyset query whose first key_size columns are the sort key and
+    # returns the projected rows, with the next page's cursor as a header
+    rows = c.execute(sql, params).fetchall()
+    response = jsonify([dict(zip(fields, row[key_size:])) for row in rows[:limit]])
+    if len(rows) > limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(rows[limit - 1][:key_size])
+    response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor'
+    return response
+
+def _read_csv_rows(stream, parse_row):
+    # Parse an uploaded CSV straight off the request stream, falling back to
+    # cp1252 for files that aren't UTF-8
+    for encoding in ('utf-8', 'cp1252'):
+        stream.seek(0)
+        text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+        try:
+            return [parse_row(row) for row in csv.DictReader(text)]
+        except UnicodeDecodeError:
+            if encoding == 'cp1252':
+                raise
+        finally:
+            text.detach()
 
 def register_routes(app):
 
+    @app.teardown_appcontext
+    def release_connection(exception=None):
+        db.release()
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_timing(response):
+        # Per-request timing header plus the request latency histogram
+        start = g.pop('request_start', None)
+        if start is not None:
+            elapsed = time.perf_counter() - start
+            response.headers['Server-Timing'] = f'app;dur={elapsed * 1000:.1f}'
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            metrics.observe('http_request_seconds', elapsed, method=request.method,
+                            endpoint=endpoint, status=response.status_code)
+        return response
+
+    @app.route('/api/metrics', methods=['GET'])
+    def get_metrics():
+        return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
     @app.route('/api/resume/upload', methods=['POST'])
     def upload_resume():
         if 'file' not in request.files:
@@ -34,6 +109,12 @@ def register_routes(app):
             filename = secure_filename(file.filename)
             filepath = os.path.join(Config.RESUMES_FOLDER, filename)
             file.save(filepath)
+            # Pre-extract the text so the pipeline finds it ready; a parse
+            # failure here is retried by extract-pdf-data later
+            try:
+                pdf_extract.extract_texts([filepath])
+            except Exception as e:
+                print(f"Error pre-extracting {filename}: {e}")
             return jsonify({'message': 'Resume uploaded successfully', 'filename': filename}), 200
         
         return jsonify({'error': 'Invalid file type'}), 400
@@ -49,40 +130,66 @@ def register_routes(app):
 
         if file and file.filename.endswith('.csv'):
             try:
-                try:
-                    csv_content = file.read().decode('utf-8')
-                except UnicodeDecodeError:
-                    file.seek(0)
-                    csv_content = file.read().decode('cp1252')
+                rows = _read_csv_rows(file.stream, parse_job_row)
+            except (KeyError, ValueError) as e:
+                return jsonify({'error': f'Invalid jobs CSV: {e}'}), 400
 
-                csv_file = io.StringIO(csv_content)
-                csv_reader = csv.DictReader(csv_file)
+            try:
+                # Upsert by title/description hash so unchanged jobs keep their summaries
+                with db.transaction() as conn:
+                    counts = upsert_jobs(conn, rows)
 
-                conn = sqlite3.connect(Config.DATABASE_FILE)
-                c = conn.cursor()
+                return jsonify({'message': 'Jobs uploaded successfully', **counts}), 200
 
-                c.execute('DELETE FROM jobs')
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
+        return jsonify({'error': 'Invalid file type'}), 400
 
-                for row in csv_reader:
-                    c.execute('''
-                        INSERT INTO jobs (title, description, threshold, max_candidates)
-                        VALUES (?, ?, ?, ?)
-                    ''', (
-                        row['Job Title'],
-                        row['Job Description'],
-                        float(row.get('Threshold', 10)),
-                        int(row.get('Max Candidates', 5))
-                    ))
+    @app.route('/api/resumes/bulk', methods=['POST'])
+    def bulk_ingest_resumes():
+        # A ZIP of PDFs or a CSV of extracted text (Filename, Text), filed for
+        # the form's jobId and/or per file by a mapping CSV (Filename, Job ID,
+        # optional Applicant Name and Email). extract=true also queues extract-pdf-data.
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file part'}), 400
 
-                conn.commit()
-                conn.close()
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No selected file'}), 400
 
-                return jsonify({'message': 'Jobs uploaded successfully'}), 200
+        name = file.filename.lower()
+        if not name.endswith(('.zip', '.csv')):
+            return jsonify({'error': 'Invalid file type'}), 400
 
-            except Exception as e:
-                return jsonify({'error': str(e)}), 500
+        try:
+            default_job = int(request.form['jobId']) if request.form.get('jobId') else None
+        except ValueError:
+            return jsonify({'error': 'jobId must be an integer'}), 400
 
-        return jsonify({'error': 'Invalid file type'}), 400
+        try:
+            mapping = parse_mapping(request.files['mapping'].stream) if 'mapping' in request.files else {}
+            ingest = ResumeIngest(default_job, mapping)
+            try:
+                if name.endswith('.zip'):
+                    ingest.add_zip(file.stream)
+                else:
+                    ingest.add_csv(file.stream)
+            except BaseException:
+                ingest.discard()  # nothing is half-ingested: remove the files already stored
+                raise
+        except KeyError as e:
+            return jsonify({'error': f'Invalid upload: missing column {e.args[0]}'}), 400
+        except (ValueError, csv.Error, zipfile.BadZipFile):
+            return jsonify({'error': 'Invalid upload: the file could not be read'}), 400
+
+        try:
+            result = ingest.commit()
+            if _flag(request.form.get('extract')) and result['ingested']:
+                result['taskId'] = task_queue.enqueue('extract-pdf-data', {})
+            return jsonify({'message': 'Resumes ingested successfully', **result}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
 
     @app.route('/api/apply', methods=['POST'])
     def apply_job():
@@ -91,291 +198,146 @@ def register_routes(app):
             return jsonify({'error': 'Missing required fields'}), 400
 
         try:
-            conn = sqlite3.connect(Config.DATABASE_FILE)
+            conn = db.get_connection()
             c = conn.cursor()
             
             # Check if job exists
             c.execute('SELECT id FROM jobs WHERE id = ?', (data['jobId'],))
             job = c.fetchone()
             if not job:
-                conn.close()
                 return jsonify({'error': 'Job not found'}), 404
+
+            # Content hash of the resume, so bulk ingestion recognizes it as already filed
+            try:
+                resume_sha256 = pdf_extract.file_sha256(
+                    os.path.join(Config.RESUMES_FOLDER, os.path.basename(data['resumeFile']))
+                )
+            except OSError:
+                resume_sha256 = None
             
             # Insert new application
-            c.execute('''
-                INSERT INTO applications (
-                    username,
-                    email,
-                    resume_text,
-                    job_id,
-                    applied_at
-                ) VALUES (?, ?, ?, ?, ?)
-            ''', (
-                data['applicantName'],
-                data['email'],
-                data['resumeFile'],
-                data['jobId'],
-                datetime.now().isoformat()
-            ))
-            
-            conn.commit()
-            conn.close()
+            with db.transaction() as conn:
+                conn.execute('''
+                    INSERT INTO applications (
+                        username,
+                        email,
+                        resume_text,
+                        job_id,
+                        applied_at,
+                        resume_sha256
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    data['applicantName'],
+                    data['email'],
+                    data['resumeFile'],
+                    data['jobId'],
+                    datetime.now().isoformat(),
+                    resume_sha256
+                ))
             
             return jsonify({'message': 'Application submitted successfully'}), 200
         except Exception as e:
-            if 'conn' in locals():
-                conn.close()
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/jobs', methods=['GET'])
     def get_jobs():
+        # Paged by id: ?limit=&cursor=&fields=; the next cursor is in X-Next-Cursor
         try:
-            conn = sqlite3.connect(Config.DATABASE_FILE)
-            c = conn.cursor()
-            c.execute('''
-                SELECT id, title, description, threshold, max_candidates, summary
+            limit = parse_limit(request.args.get('limit'))
+            fields = parse_fields(request.args.get('fields'), JOB_COLUMNS)
+            cursor = decode_cursor(request.args.get('cursor'), 1)
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            c = db.get_connection().cursor()
+            columns = ', '.join(JOB_COLUMNS[field] for field in fields)
+            return _page(c, f'''
+                SELECT id, {columns}
                 FROM jobs
-            ''')
-            jobs = c.fetchall()
-            conn.close()
-            
-            jobs_list = [{
-                'id': job[0],
-                'Job Title': job[1],
-                'Job Description': job[2],
-                'threshold': job[3],
-                'maxCandidatest': job[4],
-                'summary': job[5]
-            } for job in jobs]
-            return jsonify(jobs_list)
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (cursor[0] if cursor else -1, limit + 1), fields, 1, limit)
         except Exception as e:
             return jsonify({'error': str(e)}), 500 
 
+    def enqueue(stage, **params):
+        task_id = task_queue.enqueue(stage, params)
+        return jsonify({'taskId': task_id, 'statusUrl': f'/api/tasks/{task_id}'}), 202
+
     @app.route('/api/extract-pdf-data', methods=['POST'])
     def extract_pdf_data():
         try:
-            conn = sqlite3.connect(Config.DATABASE_FILE)
-            c = conn.cursor()
-            
-            c.execute('''
-                SELECT a.id, a.username, a.resume_text, j.title, a.applied_at, a.job_id
-                FROM applications a
-                JOIN jobs j ON a.job_id = j.id
-                WHERE a.extracted_data IS NULL
-            ''')
-            applications = c.fetchall()
-            
-            extracted_data = []
-            
-            for app in applications:
-                app_id, username, resume_filename, job_title, applied_at, job_id = app
-                resume_path = os.path.join(Config.RESUMES_FOLDER, resume_filename)
-                
-                if os.path.exists(resume_path):
-                    loader = PyMuPDFLoader(resume_path)
-                    docs = loader.load()
-                    resume_text = "\n".join([doc.page_content for doc in docs])
-                    # Run resume summarization chain
-                    resume_summarize = summarize_resume_chain.run(resume=resume_text)
-                    # Generate embedding for resume summary
-                    resume_embedding = embedding_model.encode(resume_summarize)
-                    # Store embedding as JSON string
-                    embedding_json = json.dumps(resume_embedding.tolist())
-                    c.execute('''
-                        UPDATE applications 
-                        SET extracted_data = ?, embedding = ?
-                        WHERE id = ?
-                    ''', (resume_summarize, embedding_json, app_id))
-                    
-                    extracted_data.append({
-                        'username': username,
-                        'resume_text': resume_summarize,
-                        'job_title': job_title,
-                        'applied_at': applied_at,
-                        'job_id': job_id
-                    })
-            
-            conn.commit()
-            conn.close()
-            
-            return jsonify({
-                'message': 'PDF data extracted successfully',
-                'extracted_data': extracted_data
-            }), 200
-            
+            return enqueue('extract-pdf-data')
         except Exception as e:
-            if 'conn' in locals():
-                conn.close()
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/summarize-job', methods=['POST'])
     def summarize_job():
         try:
-            conn = sqlite3.connect(Config.DATABASE_FILE)
-            c = conn.cursor()
-            
-            c.execute('SELECT id, description FROM jobs WHERE summary IS NULL')
-            jobs = c.fetchall()
-            
-            for job_id, description in jobs:
-                summary = summarize_chain.run(job_description=description).strip()
-                # Generate embedding for job summary
-                job_embedding = embedding_model.encode(summary)
-                # Store embedding as JSON string
-                embedding_json = json.dumps(job_embedding.tolist())
-                c.execute('UPDATE jobs SET summary = ?, embedding = ? WHERE id = ?', (summary, embedding_json, job_id))
-            
-            conn.commit()
-            conn.close()
-            
-            return jsonify({'message': 'Jobs summarized successfully'}), 200
+            return enqueue('summarize-job')
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/compute-matches', methods=['POST'])
     def compute_matches():
+        # force=true re-scores every pair, dry_run=true only reports pending work,
+        # top_n=N sends only each job's N best hybrid candidates to the LLM (0 = all)
+        options = request.get_json(silent=True) or {}
+        force = _flag(request.args.get('force', options.get('force')))
+        dry_run = _flag(request.args.get('dry_run', options.get('dry_run')))
         try:
-            conn = sqlite3.connect(Config.DATABASE_FILE)
-            c = conn.cursor()
-            c.execute('''
-                SELECT a.id, a.extracted_data, j.description
-                FROM applications a
-                JOIN jobs j ON a.job_id = j.id
-                WHERE a.extracted_data IS NOT NULL
-            ''')
-            applications = c.fetchall()
-
-            for app_id, extracted_data, job_description in applications:
-                # Run structured LLM with prompt
-                prompt = match_prompt.format(job_description=job_description, resume_text=extracted_data)
-                match_score = match_score_structured_llm.invoke(prompt)            
-                match_score_json = json.dumps(match_score)
-                c.execute('''
-                    UPDATE applications
-                    SET match_score = ?
-                    WHERE id = ?
-                ''', (match_score_json, app_id))
-        
-            conn.commit()
-            conn.close()
-            return jsonify({'message': 'Match scores computed successfully'}), 200
-            
+            top_n = int(request.args.get('top_n', options.get('top_n', Config.HYBRID_TOP_N)))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'top_n must be an integer'}), 400
+        try:
+            if dry_run:
+                pending, total, prefiltered = pipeline.pending_matches(force, top_n)
+                return jsonify({'pending': len(pending), 'total': total, 'prefiltered': prefiltered}), 200
+            return enqueue('compute-matches', force=force, top_n=top_n)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/jobs/<int:job_id>/shortlist', methods=['GET'])
+    def get_shortlist(job_id):
+        # The job's best candidates by fused lexical + semantic score
+        try:
+            top_n = request.args.get('top_n', Config.HYBRID_TOP_N, type=int)
+            method = request.args.get('method', Config.HYBRID_FUSION)
+            if method not in ('rrf', 'weighted'):
+                return jsonify({'error': 'method must be rrf or weighted'}), 400
+            candidates = hybrid.shortlist(top_n, [job_id], method).get(job_id, [])
+            return jsonify([{
+                'applicationId': app_id,
+                'fusedScore': fused,
+                'lexicalScore': lexical,
+                'semanticScore': semantic
+            } for app_id, fused, lexical, semantic in candidates])
         except Exception as e:
-            if 'conn' in locals():
-                conn.close()
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/select-candidates', methods=['POST'])
     def select_candidates():
         try:
-            # Connect to SQLite database
-            conn = sqlite3.connect(Config.DATABASE_FILE)
-            c = conn.cursor()
-
-            # Clear existing selected candidates
-            c.execute('DELETE FROM selected_candidates')
-
-            # Reset selection status in applications
-            c.execute('UPDATE applications SET selected = FALSE')
-
-            # Query all job IDs and embeddings from jobs table
-            c.execute('SELECT id, summary, embedding FROM jobs')
-            jobs = c.fetchall()
-
-            if not jobs:
-                conn.close()
-                return jsonify({"error": "No jobs found in the jobs table"}), 404
-
-            # Process each job
-            for job_id, job_summary, job_embedding_json in jobs:
-                if not job_summary or not job_embedding_json:
-                    continue  # Skip jobs without summaries or embeddings
-
-                # Load job embedding
-                try:
-                    job_embedding = np.array(json.loads(job_embedding_json), dtype=np.float32)
-                except json.JSONDecodeError:
-                    continue  # Skip if embedding is invalid
-
-                # Normalize job embedding
-                job_embedding = job_embedding / np.linalg.norm(job_embedding)
-
-                # Query all candidates for the current job_id
-                c.execute('''
-                    SELECT id, username, email, resume_text, job_id, applied_at, extracted_data,
-                           match_score, selected, invitation_sent, embedding
-                    FROM applications
-                    WHERE job_id = ?
-                ''', (job_id,))
-                rows = c.fetchall()
-
-                if not rows:
-                    continue  # Skip if no applications for this job
-
-                # Compute similarity scores for candidates
-                candidates = []
-                for row in rows:
-                    embedding_json = row[10]  # embedding is the 11th column
-                    if not embedding_json:
-                        continue
-                    try:
-                        resume_embedding = np.array(json.loads(embedding_json), dtype=np.float32)
-                        # Normalize resume embedding
-                        resume_embedding = resume_embedding / np.linalg.norm(resume_embedding)
-                        # Compute cosine similarity
-                        similarity = float(np.dot(job_embedding, resume_embedding))
-                        candidates.append({
-                            'id': str(row[0]),
-                            'similarity': similarity
-                        })
-                    except json.JSONDecodeError:
-                        continue  # Skip invalid embeddings
-
-                if not candidates:
-                    continue  # Skip if no valid embeddings
-
-                # Sort candidates by similarity and select top 2
-                candidates.sort(key=lambda x: x['similarity'], reverse=True)
-                selected_ids = [c['id'] for c in candidates[:2]]  # Max 2 candidates
-
-                if not selected_ids:
-                    continue  # Skip if no candidates selected
-
-                # Update database for selected candidates
-                for row in rows:
-                    app_id = str(row[0])
-                    if app_id in selected_ids:
-                        # Mark application as selected
-                        c.execute('''
-                            UPDATE applications
-                            SET selected = TRUE
-                            WHERE id = ?
-                        ''', (app_id,))
-                        
-                        # Find similarity score for this candidate
-                        similarity = next(c['similarity'] for c in candidates if c['id'] == app_id)
-                        # Store similarity as match_score
-                        match_score = {'similarity': similarity}
-                        c.execute('''
-                            INSERT INTO selected_candidates (application_id, job_id, match_score)
-                            VALUES (?, ?, ?)
-                        ''', (row[0], row[4], json.dumps(match_score)))
-
-            conn.commit()
-            conn.close()
-
-            return jsonify({'message': 'Candidates filtered and selected successfully for all jobs'}), 200
-
+            return enqueue('select-candidates')
         except Exception as e:
-            if 'conn' in locals():
-                conn.close()
             return jsonify({'error': f"Failed to select candidates: {str(e)}"}), 500
+
+    @app.route('/api/tasks/<int:task_id>', methods=['GET'])
+    def get_task(task_id):
+        try:
+            task = task_queue.get(task_id)
+            if not task:
+                return jsonify({'error': 'Task not found'}), 404
+            return jsonify(task)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
     
     @app.route('/api/send-invitations', methods=['POST'])
     def send_invitations():
         try:
-            conn = sqlite3.connect(Config.DATABASE_FILE)
-            c = conn.cursor()
+            c = db.get_connection().cursor()
             
             c.execute('''
                 SELECT a.id, a.username, j.title
@@ -388,15 +350,13 @@ def register_routes(app):
             
             for app_id, username, job_title in candidates:
                 print(f"Sending invitation to {username} for {job_title}")
-                
-                c.execute('''
+            
+            with db.transaction() as conn:
+                conn.executemany('''
                     UPDATE applications
                     SET invitation_sent = TRUE
                     WHERE id = ?
-                ''', (app_id,))
-            
-            conn.commit()
-            conn.close()
+                ''', [(app_id,) for app_id, _, _ in candidates])
             
             return jsonify({'message': 'Invitations sent successfully'}), 200
         except Exception as e:
@@ -404,45 +364,49 @@ def register_routes(app):
 
     @app.route('/api/applications', methods=['GET'])
     def get_applications():
+        # Newest first, paged on (applied_at, id): ?limit=&cursor=&fields=
+        # plus optional job_id= and selected= filters
         try:
-            conn = sqlite3.connect(Config.DATABASE_FILE)
-            c = conn.cursor()
-            
-            c.execute('''
-                SELECT 
-                    a.id, a.username, a.resume_text, j.title, 
-                    a.applied_at, a.job_id, a.extracted_data, 
-                    a.match_score, a.selected, a.invitation_sent
+            limit = parse_limit(request.args.get('limit'))
+            fields = parse_fields(request.args.get('fields'), APPLICATION_COLUMNS)
+            cursor = decode_cursor(request.args.get('cursor'), 2)
+            job_id = request.args.get('job_id', type=int)
+            if 'job_id' in request.args and job_id is None:
+                raise PaginationError('job_id must be an integer')
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+
+        conditions = []
+        params = []
+        if job_id is not None:
+            conditions.append('a.job_id = ?')
+            params.append(job_id)
+        if 'selected' in request.args:
+            conditions.append('a.selected = ?')
+            params.append(1 if _flag(request.args['selected']) else 0)
+        if cursor:
+            conditions.append('(a.applied_at, a.id) < (?, ?)')
+            params.extend(cursor)
+
+        try:
+            c = db.get_connection().cursor()
+            columns = ', '.join(APPLICATION_COLUMNS[field] for field in fields)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            return _page(c, f'''
+                SELECT a.applied_at, a.id, {columns}
                 FROM applications a
                 JOIN jobs j ON a.job_id = j.id
-                ORDER BY a.applied_at DESC
-            ''')
-            
-            applications = c.fetchall()
-            conn.close()
-            
-            applications_list = [{
-                'id': app[0],
-                'applicantName': app[1],
-                'resumeFile': app[2],
-                'jobTitle': app[3],
-                'appliedAt': app[4],
-                'jobId': app[5],
-                'extractedData': app[6],
-                'matchScore': app[7],
-                'selected': app[8],
-                'invitationSent': app[9]
-            } for app in applications]
-            
-            return jsonify(applications_list)
+                {where}
+                ORDER BY a.applied_at DESC, a.id DESC
+                LIMIT ?
+            ''', (*params, limit + 1), fields, 2, limit)
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/selected-candidates', methods=['GET'])
     def get_selected_candidates():
         try:
-            conn = sqlite3.connect(Config.DATABASE_FILE)
-            c = conn.cursor()
+            c = db.get_connection().cursor()
             
             c.execute('''
                 SELECT 
@@ -459,7 +423,6 @@ def register_routes(app):
             ''')
             
             candidates = c.fetchall()
-            conn.close()
             
             candidates_list = [{
                 'id': candidate[0],
@@ -472,6 +435,4 @@ def register_routes(app):
             
             return jsonify(candidates_list)
         except Exception as e:
-            if 'conn' in locals():
-                conn.close()
             return jsonify({'error': str(e)}), 500
\ No newline at end of file
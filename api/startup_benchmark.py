@@ -0,0 +1,62 @@
+"""Time-to-first-response of the light endpoints after a cold create_app()."""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY_MODULES = ['langchain', 'langchain_groq', 'sentence_transformers', 'torch', 'sklearn']
+
+# Runs in a fresh interpreter so imports are really cold; prints one JSON line
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {api_dir!r})
+from config import Config
+Config.PREWARM_MODELS = {prewarm!r}
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+client = app.test_client()
+timings = {{}}
+for path in {paths!r}:
+    t = time.perf_counter()
+    status = client.get(path).status_code
+    timings[path] = {{'status': status, 'ms': round((time.perf_counter() - t) * 1000, 2),
+                      'sinceStartMs': round((time.perf_counter() - start) * 1000, 2)}}
+print(json.dumps({{
+    'importMs': round((imported - start) * 1000, 2),
+    'createAppMs': round((created - imported) * 1000, 2),
+    'endpoints': timings,
+    'heavyModulesLoaded': sorted(m for m in {heavy!r} if m in sys.modules)
+}}))
+'''
+
+def run_once(paths, prewarm):
+    code = CHILD.format(api_dir=API_DIR, prewarm=prewarm, paths=paths, heavy=HEAVY_MODULES)
+    # Fresh working directory so the run gets its own uploads/ and database
+    with tempfile.TemporaryDirectory() as cwd:
+        output = subprocess.run([sys.executable, '-c', code], cwd=cwd, check=True,
+                                capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--prewarm', action='store_true', help='start the model prewarm thread as in production')
+    parser.add_argument('--paths', nargs='+', default=['/api/jobs', '/api/applications?limit=50', '/api/selected-candidates'])
+    args = parser.parse_args()
+
+    runs = [run_once(args.paths, args.prewarm) for _ in range(args.runs)]
+    first = [run['endpoints'][args.paths[0]]['sinceStartMs'] for run in runs]
+    print(json.dumps({
+        'runs': runs,
+        'timeToFirstResponseMs': {'min': min(first), 'max': max(first), 'mean': round(sum(first) / len(first), 2)}
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from config import Config
+import db
+import metrics
+
+# Persisted queue for pipeline stages, stored in the pipeline_tasks table.
+# POST handlers enqueue a task and return its id; a local pool of worker
+# threads runs queued tasks and records progress as each batch commits.
+# Running tasks hold a lease: a heartbeat thread refreshes updated_at for the
+# tasks this process owns, and a task whose lease has expired (its process
+# crashed or was killed) is requeued by whichever process polls next. Because
+# stages only pick up outstanding work they resume from the last committed batch.
+
+MAX_STORED_ERRORS = 20
+
+# host:pid alone is reused by restarted containers; the boot id tells processes apart
+BOOT_ID = uuid.uuid4().hex[:12]
+
+def _owner():
+    return f'{socket.gethostname()}:{os.getpid()}:{BOOT_ID}'
+
+class TaskProgress:
+    def __init__(self, queue, task_id):
+        self.queue = queue
+        self.task_id = task_id
+
+    def set_total(self, total):
+        self.queue._update(self.task_id, 'total = ?', (total,))
+
+    def advance(self, processed, errors=()):
+        with db.transaction(self.queue.db_file) as conn:
+            row = conn.execute('SELECT errors FROM pipeline_tasks WHERE id = ?', (self.task_id,)).fetchone()
+            stored = (json.loads(row[0]) if row and row[0] else []) + list(errors)
+            conn.execute('''
+                UPDATE pipeline_tasks
+                SET processed = processed + ?, error_count = error_count + ?, errors = ?, updated_at = ?
+                WHERE id = ?
+            ''', (processed, len(errors), json.dumps(stored[-MAX_STORED_ERRORS:]), time.time(), self.task_id))
+
+class TaskQueue:
+    def __init__(self, stages, db_file=None):
+        self.stages = stages
+        self.db_file = db_file or Config.DATABASE_FILE
+        self._wakeup = threading.Event()
+        self._threads = []
+
+    def _update(self, task_id, assignments, params):
+        with db.transaction(self.db_file) as conn:
+            conn.execute(
+                f'UPDATE pipeline_tasks SET {assignments}, updated_at = ? WHERE id = ?',
+                (*params, time.time(), task_id)
+            )
+
+    def enqueue(self, stage, params=None):
+        if stage not in self.stages:
+            raise ValueError(f'Unknown pipeline stage: {stage}')
+        params_json = json.dumps(params or {}, sort_keys=True)
+        with db.transaction(self.db_file) as conn:
+            self._requeue_expired(conn)
+            # A stage that is already waiting or running with the same params is reused
+            row = conn.execute('''
+                SELECT id FROM pipeline_tasks
+                WHERE stage = ? AND params = ? AND status IN ('queued', 'running')
+                ORDER BY id LIMIT 1
+            ''', (stage, params_json)).fetchone()
+            if row:
+                return row[0]
+            now = time.time()
+            c = conn.execute('''
+                INSERT INTO pipeline_tasks (stage, params, status, created_at, updated_at)
+                VALUES (?, ?, 'queued', ?, ?)
+            ''', (stage, params_json, now, now))
+            task_id = c.lastrowid
+        self._wakeup.set()
+        return task_id
+
+    def get(self, task_id):
+        row = db.get_connection(self.db_file).execute('''
+            SELECT id, stage, params, status, total, processed, error_count, errors, result,
+                   attempts, created_at, started_at, updated_at, finished_at
+            FROM pipeline_tasks WHERE id = ?
+        ''', (task_id,)).fetchone()
+        if not row:
+            return None
+        (task_id, stage, params, status, total, processed, error_count, errors, result,
+         attempts, created_at, started_at, updated_at, finished_at) = row
+        elapsed = ((finished_at or updated_at) - started_at) if started_at else 0
+        return {
+            'id': task_id,
+            'stage': stage,
+            'params': json.loads(params or '{}'),
+            'status': status,
+            'total': total,
+            'processed': processed,
+            'errorCount': error_count,
+            'errors': json.loads(errors or '[]'),
+            'result': json.loads(result) if result else None,
+            'attempts': attempts,
+            'elapsedSeconds': round(elapsed, 3),
+            'throughput': round(processed / elapsed, 3) if elapsed > 0 else None,
+            'createdAt': created_at,
+            'startedAt': started_at,
+            'finishedAt': finished_at
+        }
+
+    def start(self, workers=None):
+        if self._threads:
+            return
+        heartbeat = threading.Thread(target=self._heartbeat, name='task-heartbeat', daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        for i in range(workers or Config.TASK_WORKERS):
+            thread = threading.Thread(target=self._worker, name=f'task-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _heartbeat(self):
+        while True:
+            try:
+                with db.transaction(self.db_file) as conn:
+                    conn.execute('''
+                        UPDATE pipeline_tasks SET updated_at = ? WHERE status = 'running' AND owner = ?
+                    ''', (time.time(), _owner()))
+            except sqlite3.OperationalError:
+                pass  # database busy, the lease is long enough to try again next beat
+            time.sleep(Config.TASK_HEARTBEAT_SECONDS)
+
+    def _requeue_expired(self, conn):
+        # Running tasks whose owner stopped heartbeating go back to the queue
+        requeued = conn.execute('''
+            UPDATE pipeline_tasks SET status = 'queued', owner = NULL
+            WHERE status = 'running' AND updated_at < ?
+        ''', (time.time() - Config.TASK_LEASE_SECONDS,)).rowcount
+        if requeued:
+            print(f"Requeued {requeued} interrupted pipeline task(s)")
+
+    def _claim(self):
+        with db.transaction(self.db_file) as conn:
+            self._requeue_expired(conn)
+            row = conn.execute('''
+                SELECT id, stage, params FROM pipeline_tasks
+                WHERE status = 'queued' ORDER BY id LIMIT 1
+            ''').fetchone()
+            if not row:
+                return None
+            now = time.time()
+            claimed = conn.execute('''
+                UPDATE pipeline_tasks
+                SET status = 'running', owner = ?, attempts = attempts + 1,
+                    processed = 0, error_count = 0, errors = '[]', started_at = ?, updated_at = ?
+                WHERE id = ? AND status = 'queued'
+            ''', (_owner(), now, now, row[0])).rowcount
+        return row if claimed else None
+
+    def _worker(self):
+        while True:
+            try:
+                task = self._claim()
+            except sqlite3.OperationalError:
+                task = None  # database busy, try again on the next poll
+            if task is None:
+                self._wakeup.wait(Config.TASK_POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+            self._run(*task)
+
+    def _run(self, task_id, stage, params):
+        start = time.perf_counter()
+        try:
+            result = self.stages[stage](TaskProgress(self, task_id), **json.loads(params or '{}'))
+            metrics.observe('pipeline_stage_seconds', time.perf_counter() - start, stage=stage)
+            metrics.inc('pipeline_tasks_total', stage=stage, status='completed')
+            self._update(task_id, "status = 'completed', result = ?, finished_at = ?",
+                         (json.dumps(result), time.time()))
+        except Exception as e:
+            metrics.observe('pipeline_stage_seconds', time.perf_counter() - start, stage=stage)
+            metrics.inc('pipeline_tasks_total', stage=stage, status='failed')
+            # Drop anything the stage left half-written before recording the failure
+            db.release()
+            self._update(task_id, "status = 'failed', result = ?, finished_at = ?",
+                         (json.dumps({'error': str(e)}), time.time()))
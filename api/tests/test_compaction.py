@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compaction import clean
+
+MULTI_ROLE_RESUME = """Jane Doe
+jane@example.com
+Experience
+Software Engineer
+Acme Corp
+2019
+- Built APIs in Python
+Software Engineer
+Beta Inc
+2021
+- Built APIs in Python
+Education
+BSc Computer Science"""
+
+def test_multi_role_resume_keeps_titles_and_dates():
+    lines = clean(MULTI_ROLE_RESUME).split('\n')
+    assert lines.count('Software Engineer') == 2
+    assert lines.count('- Built APIs in Python') == 2
+    assert '2019' in lines and '2021' in lines
+    assert lines == MULTI_ROLE_RESUME.split('\n')
+
+def test_page_numbers_and_repeated_headers_are_dropped_at_page_edges():
+    pages = [
+        'Jane Doe - Resume\nExperience\nSoftware Engineer\n2019\n1',
+        'Jane Doe - Resume\nSoftware Engineer\nBeta Inc\n2',
+        'Jane Doe - Resume\nEducation\nBSc Computer Science\nPage 3 of 3',
+    ]
+    lines = clean('\f'.join(pages)).split('\n')
+    assert lines.count('Jane Doe - Resume') == 1
+    assert '1' not in lines and '2' not in lines and 'Page 3 of 3' not in lines
+    assert lines.count('Software Engineer') == 2
+    assert '2019' in lines
@@ -1,14 +1,21 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
+import hashlib
 
 # Set your Groq API key
 groq_api_key = "groq_test_XXXXXXXXXXXXXXXXXXXXXX"
 
 def compute_match_score(resume_text, job_description):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    from lexical import lexical_scorer
+
     if not resume_text or not job_description:
         return 0.0
+
+    # Prefer the corpus-fitted scorer; its IDF reflects the whole corpus.
+    # Batch scoring should go through lexical_scorer.score() directly.
+    score = lexical_scorer.score_texts(resume_text, job_description)
+    if score is not None:
+        return score
     
     vectorizer = TfidfVectorizer(stop_words='english')
     try:
@@ -19,7 +26,20 @@ def compute_match_score(resume_text, job_description):
         print(f"Error computing match score: {e}")
         return 0.0
 
+def match_fingerprint(extracted_data, job_description, prompt_version):
+    # Identifies the inputs a match score was computed from; a changed resume
+    # summary, job description or prompt version gives a different fingerprint
+    parts = [
+        hashlib.sha256((extracted_data or '').encode('utf-8')).hexdigest(),
+        hashlib.sha256((job_description or '').encode('utf-8')).hexdigest(),
+        str(prompt_version)
+    ]
+    return hashlib.sha256(':'.join(parts).encode('utf-8')).hexdigest()
+
 def job_summurizer(job_description):
+    from langchain_groq import ChatGroq
+    from langchain_core.prompts import ChatPromptTemplate
+
     # Initialize the Groq chat model
     chat = ChatGroq(
         api_key=groq_api_key,
@@ -3,6 +3,7 @@ import axios from 'axios';
 import JobUploader from '../components/JobUploader';
 import WorkflowStatus from '../components/WorkflowStatus';
 import JobList from '../components/JobList';
+import { fetchAllPages, fetchPage } from '../pagination';
 import { FileText, Brain, Star, Mail, UserCheck, Award, Calendar, CheckCircle, Bot, FileSearch } from 'lucide-react';
 
 interface Job {
@@ -47,9 +48,15 @@ interface WorkflowStep {
   icon: React.ReactNode;
 }
 
+const APPLICATIONS_URL = 'http://localhost:5000/api/applications';
+const APPLICATIONS_PAGE_SIZE = 200;
+const APPLICATION_FIELDS = 'id,jobId,jobTitle,applicantName,resumeFile,appliedAt,matchScore,selected,invitationSent';
+
 function AdminPage() {
   const [jobs, setJobs] = useState<Job[]>([]);
   const [applications, setApplications] = useState<Application[]>([]);
+  const [applicationsCursor, setApplicationsCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedCandidates, setSelectedCandidates] = useState<SelectedCandidate[]>([]);
   const [processing, setProcessing] = useState(false);
   const [timer, setTimer] = useState(0);
@@ -143,12 +150,11 @@ function AdminPage() {
     return () => clearInterval(interval);
   }, [timerActive]);
 
+  // Counted from the selected candidates, since only some applications are loaded
   useEffect(() => {
-    const selected = applications.filter(app => app.selected).length;
-    const invited = applications.filter(app => app.invitationSent).length;
-    setSelectedCount(selected);
-    setInvitationsSent(invited);
-  }, [applications]);
+    setSelectedCount(selectedCandidates.length);
+    setInvitationsSent(selectedCandidates.filter(candidate => candidate.invitationSent).length);
+  }, [selectedCandidates]);
 
   const updateStepStatus = (stepIndex: number, status: 'pending' | 'processing' | 'completed') => {
     setWorkflowSteps(steps => steps.map((step, index) => 
@@ -156,10 +162,26 @@ function AdminPage() {
     ));
   };
 
+  // Pipeline stages run as background tasks: start one and poll until it finishes
+  const runPipelineStage = async (stage: string) => {
+    const response = await axios.post(`http://localhost:5000/api/${stage}`);
+    const { taskId } = response.data;
+    while (true) {
+      const { data: task } = await axios.get(`http://localhost:5000/api/tasks/${taskId}`);
+      if (task.status === 'completed') {
+        return task;
+      }
+      if (task.status === 'failed') {
+        throw new Error(task.result?.error || `${stage} failed`);
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+  };
+
   const extractDataFromPDF = async () => {
     try {
       updateStepStatus(0, 'processing');
-      await axios.post('http://localhost:5000/api/extract-pdf-data');
+      await runPipelineStage('extract-pdf-data');
       await new Promise(resolve => setTimeout(resolve, 2000));
       updateStepStatus(0, 'completed');
       updateStepStatus(1, 'processing');
@@ -175,7 +197,7 @@ function AdminPage() {
   const summarizeJobs = async () => {
     try {
       updateStepStatus(2, 'processing');
-      await axios.post('http://localhost:5000/api/summarize-job');
+      await runPipelineStage('summarize-job');
       await new Promise(resolve => setTimeout(resolve, 2000));
       updateStepStatus(2, 'completed');
     } catch (error) {
@@ -187,7 +209,7 @@ function AdminPage() {
   const computeMatchScores = async () => {
     try {
       updateStepStatus(3, 'processing');
-      await axios.post('http://localhost:5000/api/compute-matches');
+      await runPipelineStage('compute-matches');
       await new Promise(resolve => setTimeout(resolve, 2000));
       updateStepStatus(3, 'completed');
     } catch (error) {
@@ -199,7 +221,7 @@ function AdminPage() {
   const selectCandidates = async () => {
     try {
       updateStepStatus(4, 'processing');
-      await axios.post('http://localhost:5000/api/select-candidates');
+      await runPipelineStage('select-candidates');
       await new Promise(resolve => setTimeout(resolve, 2000));
       updateStepStatus(4, 'completed');
       await fetchSelectedCandidates(); // Refresh selected candidates after selection
@@ -224,22 +246,43 @@ function AdminPage() {
 
   const fetchJobs = async () => {
     try {
-      const response = await axios.get('http://localhost:5000/api/jobs');
-      setJobs(response.data);
+      setJobs(await fetchAllPages<Job>('http://localhost:5000/api/jobs', { limit: 1000 }));
     } catch (error) {
       console.error('Error fetching jobs:', error);
     }
   };
 
+  // Applications load a page at a time, newest first; "Load more" appends the next page
   const fetchApplications = async () => {
     try {
-      const response = await axios.get('http://localhost:5000/api/applications');
-      setApplications(response.data);
+      const page = await fetchPage<Application>(APPLICATIONS_URL, {
+        limit: APPLICATIONS_PAGE_SIZE,
+        fields: APPLICATION_FIELDS
+      });
+      setApplications(page.rows);
+      setApplicationsCursor(page.nextCursor);
     } catch (error) {
       console.error('Error fetching applications:', error);
     }
   };
 
+  const fetchMoreApplications = async () => {
+    if (!applicationsCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage<Application>(APPLICATIONS_URL, {
+        limit: APPLICATIONS_PAGE_SIZE,
+        fields: APPLICATION_FIELDS
+      }, applicationsCursor);
+      setApplications(prev => [...prev, ...page.rows]);
+      setApplicationsCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching applications:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchSelectedCandidates = async () => {
     try {
       const response = await axios.get('http://localhost:5000/api/selected-candidates');
@@ -361,6 +404,17 @@ function AdminPage() {
 
       <div className="bg-black/20 backdrop-blur-xl shadow-2xl rounded-xl border border-purple-500/20">
         <JobList jobs={jobs} applications={applications} />
+        {applicationsCursor && (
+          <div className="flex justify-center p-6 border-t border-purple-500/20">
+            <button
+              onClick={fetchMoreApplications}
+              disabled={loadingMore}
+              className="px-6 py-2 rounded-xl text-purple-300 border border-purple-500/40 hover:bg-purple-900/30 transition-all duration-300 disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : `Load more applications (${applications.length} shown)`}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Upload, ChevronDown, ChevronUp, Briefcase, FileText, Clock, Mail, Search } from 'lucide-react';
 import axios from 'axios';
+import { fetchAllPages } from '../pagination';
 
 interface Job {
   id: number;
@@ -33,9 +34,10 @@ function UserPage() {
 
   const fetchJobs = async () => {
     try {
-      const response = await axios.get('http://localhost:5000/api/jobs');
-      setJobs(response.data);
-      setFilteredJobs(response.data);
+      // Search filters the job list client-side, so it needs every job
+      const allJobs = await fetchAllPages<Job>('http://localhost:5000/api/jobs', { limit: 1000 });
+      setJobs(allJobs);
+      setFilteredJobs(allJobs);
     } catch (error) {
       console.error('Error fetching jobs:', error);
     }
@@ -0,0 +1,30 @@
+import axios from 'axios';
+
+// List endpoints are keyset-paged: each response holds at most `limit` rows
+// and carries an X-Next-Cursor header while more rows follow.
+export interface Page<T> {
+  rows: T[];
+  nextCursor?: string;
+}
+
+export const fetchPage = async <T>(
+  url: string,
+  params: Record<string, string | number>,
+  cursor?: string
+): Promise<Page<T>> => {
+  const response = await axios.get(url, { params: { ...params, cursor } });
+  return { rows: response.data, nextCursor: response.headers['x-next-cursor'] };
+};
+
+// Follow X-Next-Cursor to the last page. Only for small tables (jobs) that
+// the page needs in full; large lists load a page at a time with fetchPage.
+export const fetchAllPages = async <T>(url: string, params: Record<string, string | number>): Promise<T[]> => {
+  const rows: T[] = [];
+  let cursor: string | undefined;
+  do {
+    const page = await fetchPage<T>(url, params, cursor);
+    rows.push(...page.rows);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return rows;
+};